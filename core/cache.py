@@ -0,0 +1,105 @@
+"""
+Process-local caches for read-heavy endpoints.
+Values are cached under a data-version counter that write paths bump after
+they commit, so a single bump invalidates everything derived from that data.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from core.config import settings
+from core.singleflight import SingleFlight
+
+
+class VersionedCache:
+    """
+    Cache of computed values, each stored with an ETag of its content.
+
+    - bump() invalidates every entry (call it after committing a write)
+    - entries also expire after `ttl` seconds, which bounds staleness for
+      writes made by other worker processes
+    - a value computed while a bump happened is returned but not stored
+    - concurrent misses for the same key share a single computation
+    """
+
+    def __init__(self, ttl: int = 30, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._version = 0
+        self._entries = {}  # key -> (version, stored_at, etag, value)
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump(self):
+        """Invalidate every cached entry"""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def get(self, key):
+        """Return (etag, value) for a fresh entry, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            version, stored_at, etag, value = entry
+            if version != self._version or time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            return etag, value
+
+    def set(self, key, value, version: int):
+        """Store a value computed at `version`; returns (etag, value)"""
+        etag = make_etag(value)
+        with self._lock:
+            if version == self._version:
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+                self._entries[key] = (version, time.monotonic(), etag, value)
+        return etag, value
+
+    def get_or_compute(self, key, compute):
+        """
+        Return (etag, value) from the cache, computing and storing it on a miss.
+        Requests that miss while the same key is already being computed wait for
+        that computation instead of starting their own (no thundering herd).
+        """
+        cached = self.get(key)
+        if cached:
+            return cached
+        version = self._version
+        return self._flight.do(
+            (key, version),
+            lambda: self.get(key) or self.set(key, compute(), version)
+        )
+
+
+def make_etag(value) -> str:
+    """Strong ETag derived from the JSON content of a response body"""
+    body = json.dumps(jsonable_encoder(value), sort_keys=True, separators=(",", ":"))
+    return '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match request header against an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+# Leaderboards only change when a stat, trophy or achievement is written
+leaderboard_cache = VersionedCache(ttl=settings.LEADERBOARD_CACHE_TTL)
+
+# Match lineups only change when stats are written or a player edits their profile
+lineup_cache = VersionedCache(ttl=settings.LINEUP_CACHE_TTL)
+
+# Completed match pages (match, lineup, trophy) change when stats, trophies or profiles are written
+match_cache = VersionedCache(ttl=settings.MATCH_CACHE_TTL)
@@ -21,6 +21,20 @@ class Settings:
     SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
     EMAIL_FROM: str = os.getenv("EMAIL_FROM", "")
 
+    # Caching
+    LEADERBOARD_CACHE_TTL: int = int(os.getenv("LEADERBOARD_CACHE_TTL", 30))
+    ACHIEVEMENT_REGISTRY_TTL: int = int(os.getenv("ACHIEVEMENT_REGISTRY_TTL", 300))
+    LINEUP_CACHE_TTL: int = int(os.getenv("LINEUP_CACHE_TTL", 300))
+    MATCH_CACHE_TTL: int = int(os.getenv("MATCH_CACHE_TTL", 300))
+
+    # Background jobs (workers share the database pool, keep it small)
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", 2))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", 5))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+    JOB_HEARTBEAT_INTERVAL: float = float(os.getenv("JOB_HEARTBEAT_INTERVAL", 15))  # seconds between "still running" marks
+    JOB_STALE_AFTER: int = int(os.getenv("JOB_STALE_AFTER", 60))  # seconds without a heartbeat before a running job is re-queued
+    JOB_RETRY_BACKOFF: float = float(os.getenv("JOB_RETRY_BACKOFF", 30))  # seconds, doubled per attempt
+
     # URLs
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:5173").rstrip("/")
     BACKEND_URL: str = os.getenv("BACKEND_URL", "http://localhost:8000").rstrip("/")
@@ -0,0 +1,51 @@
+"""
+Single-flight request coalescing.
+Concurrent calls with the same key share one execution: the first caller
+runs the function, everyone arriving while it is in flight waits for and
+receives the same result (or exception).
+"""
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}  # key -> _Call currently in flight
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Run fn() once per key at a time and share its result with concurrent callers"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """Number of keys currently being computed"""
+        with self._lock:
+            return len(self._calls)
@@ -19,7 +19,8 @@ from routers import (
     search,
     dashboard,
     settings,
-    leaderboard
+    leaderboard,
+    jobs
 )
 
 # Import models for table creation
@@ -53,26 +54,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Cursor of the next page on paginated lists
 )
 
 
 # Startup
 @app.on_event("startup")
 def startup():
-    Base.metadata.create_all(bind=engine)
-    print("📦 Tables ready.")
+    from services.startup_service import (
+        startup_fingerprint, is_up_to_date, start_backfill, backfill_missing_player_totals
+    )
 
-    # Auto-seed achievements (safe mode)
-    try:
-        from scripts.seed_achievements import seed_achievements
-        from database import SessionLocal
+    # Skip schema creation and backfills when nothing changed since the last boot
+    fingerprint = startup_fingerprint()
+    if is_up_to_date(fingerprint):
+        print("📦 Schema and seed data unchanged. Skipping startup backfill.")
+        # Users added outside the app still need a player_totals row
+        backfill_missing_player_totals()
+    else:
+        Base.metadata.create_all(bind=engine)
+        print("📦 Tables ready.")
 
-        db = SessionLocal()
-        seed_achievements(db, check_existing_players=True)
-        db.close()
-        print("🌱 Achievements seeded.")
-    except Exception as e:
-        print("⚠️ Achievement seeding skipped:", e)
+        # Player totals, achievement seeding and the league-wide check run after the app is up
+        start_backfill(fingerprint)
+
+    # Background workers for derived data (achievements, XP, trophies)
+    from services.job_queue import job_queue
+    job_queue.start()
+
+
+# Shutdown
+@app.on_event("shutdown")
+def shutdown():
+    from services.job_queue import job_queue
+    job_queue.stop()
 
 
 # Routers
@@ -90,6 +105,7 @@ app.include_router(search.router)
 app.include_router(dashboard.router)
 app.include_router(settings.router)
 app.include_router(leaderboard.router)
+app.include_router(jobs.router)
 
 
 @app.get("/")
@@ -0,0 +1,11 @@
+-- Migration: Add best_stat_id column to trophies table
+-- Records which stat a trophy was awarded for, so new stats are compared only
+-- against the holder. Existing trophies are filled in by a full rescan the
+-- next time a stat is added to their match.
+
+ALTER TABLE trophies ADD COLUMN IF NOT EXISTS best_stat_id INTEGER NULL REFERENCES stats(id);
+
+-- Verify the column was added
+-- SELECT column_name, data_type, is_nullable 
+-- FROM information_schema.columns 
+-- WHERE table_name = 'trophies' AND column_name = 'best_stat_id';
@@ -0,0 +1,10 @@
+-- Migration: Owner and heartbeat for running background jobs
+-- The process running a job refreshes heartbeat_at; workers re-queue running
+-- jobs whose heartbeat is older than JOB_STALE_AFTER seconds.
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS owner VARCHAR(100);
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP;
+
+-- Verify the columns were added
+-- SELECT column_name, data_type FROM information_schema.columns
+-- WHERE table_name = 'jobs' AND column_name IN ('owner', 'heartbeat_at');
@@ -0,0 +1,27 @@
+-- Migration: Composite indexes for the hot queries (version: add_hot_query_indexes)
+-- Run with: python migrations/run_add_hot_query_indexes_migration.py
+-- (CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so the
+-- runner executes each statement on its own and records the version in app_state.)
+
+-- Player history, last-5 ratings and achievement checks
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stats_player_created ON stats (player_id, created_at);
+-- Match lineups split by team, per-team averages
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stats_match_team ON stats (match_id, team);
+-- A player's trophies
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_trophies_awarded_to ON trophies (awarded_to);
+-- Reaction counts per news post
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_reactions_news_type ON reactions (news_id, type);
+-- A user's reactions on a news post
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_reactions_user_news ON reactions (user_id, news_id);
+-- Comments of a news post in posting order
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_comments_news_created ON comments (news_id, created_at);
+-- Newest-first news feed
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_news_created_at ON news (created_at);
+-- Newest-first match list with (match_date, id) cursor pagination
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_matches_date_id ON matches (match_date, id);
+
+-- Verify the indexes were added
+-- SELECT tablename, indexname FROM pg_indexes 
+-- WHERE indexname IN ('ix_stats_player_created', 'ix_stats_match_team', 'ix_trophies_awarded_to',
+--                     'ix_reactions_news_type', 'ix_reactions_user_news', 'ix_comments_news_created',
+--                     'ix_news_created_at', 'ix_matches_date_id');
@@ -0,0 +1,9 @@
+-- Migration: Indexes for the match page (GET /matches/{id}/full)
+-- Comments of a match in posting order, and reaction counts per match
+
+CREATE INDEX IF NOT EXISTS ix_comments_match_created ON comments (match_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_reactions_match_type ON reactions (match_id, type);
+
+-- Verify the indexes were added
+-- SELECT tablename, indexname FROM pg_indexes
+-- WHERE indexname IN ('ix_comments_match_created', 'ix_reactions_match_type');
@@ -0,0 +1,16 @@
+-- Migration: Add leaderboard ranking keys to player_totals
+-- Run this migration on databases where player_totals was created before
+-- trophy_count / achievement_count existed, then rebuild the table:
+--   python scripts/rebuild_player_totals.py
+
+ALTER TABLE player_totals ADD COLUMN IF NOT EXISTS trophy_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE player_totals ADD COLUMN IF NOT EXISTS achievement_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS ix_player_totals_rating_rank ON player_totals (avg_rating, player_id);
+CREATE INDEX IF NOT EXISTS ix_player_totals_achievement_rank ON player_totals (achievement_count, player_id);
+CREATE INDEX IF NOT EXISTS ix_player_totals_trophy_rank ON player_totals (trophy_count, player_id);
+
+-- Verify the columns were added
+-- SELECT column_name, data_type, is_nullable 
+-- FROM information_schema.columns 
+-- WHERE table_name = 'player_totals' AND column_name IN ('trophy_count', 'achievement_count');
@@ -0,0 +1,8 @@
+-- Migration: Index ratings by player
+-- GET /ratings/player/{id} filters ratings on player_id, which had no index,
+-- so every request read the whole ratings table.
+
+CREATE INDEX IF NOT EXISTS ix_ratings_player_id ON ratings (player_id);
+
+-- Verify the index was added
+-- SELECT indexname, indexdef FROM pg_indexes WHERE indexname = 'ix_ratings_player_id';
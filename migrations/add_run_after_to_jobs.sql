@@ -0,0 +1,9 @@
+-- Migration: Retry backoff for background jobs
+-- A failed job is set back to "pending" with run_after in the future;
+-- workers only claim pending jobs whose run_after is NULL or has passed.
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS run_after TIMESTAMP;
+
+-- Verify the column was added
+-- SELECT column_name, data_type FROM information_schema.columns
+-- WHERE table_name = 'jobs' AND column_name = 'run_after';
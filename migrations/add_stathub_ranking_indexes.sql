@@ -0,0 +1,13 @@
+-- Migration: Indexes for the StatHub ranking sort modes
+-- GET /leaderboard/stathub-ranking sorts on total_goals, total_assists or
+-- total_goals + total_assists (DESC), then player_id. With an index in that
+-- order the top N is read from the index instead of sorting every player.
+-- sort_by=rating uses ix_player_totals_rating_rank.
+
+CREATE INDEX IF NOT EXISTS ix_player_totals_goals_rank ON player_totals (total_goals DESC, player_id);
+CREATE INDEX IF NOT EXISTS ix_player_totals_assists_rank ON player_totals (total_assists DESC, player_id);
+CREATE INDEX IF NOT EXISTS ix_player_totals_combined_rank ON player_totals ((total_goals + total_assists) DESC, player_id);
+
+-- Verify the indexes were added
+-- SELECT indexname, indexdef FROM pg_indexes
+-- WHERE indexname IN ('ix_player_totals_goals_rank', 'ix_player_totals_assists_rank', 'ix_player_totals_combined_rank');
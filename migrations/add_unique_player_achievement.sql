@@ -0,0 +1,28 @@
+-- Migration: One progress row per (user_id, achievement_id) in player_achievements
+-- Removes duplicate rows (keeping the unlocked one, then the oldest) and adds
+-- uq_player_achievement_user_achievement so missing rows can be bulk-inserted.
+-- Rebuild player_totals afterwards if duplicates were removed:
+--   python scripts/rebuild_player_totals.py
+
+DELETE FROM player_achievements pa
+USING player_achievements keep
+WHERE pa.user_id = keep.user_id
+  AND pa.achievement_id = keep.achievement_id
+  AND (
+    COALESCE(keep.unlocked, FALSE) > COALESCE(pa.unlocked, FALSE)
+    OR (COALESCE(keep.unlocked, FALSE) = COALESCE(pa.unlocked, FALSE) AND keep.id < pa.id)
+  );
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'uq_player_achievement_user_achievement'
+    ) THEN
+        ALTER TABLE player_achievements
+        ADD CONSTRAINT uq_player_achievement_user_achievement UNIQUE (user_id, achievement_id);
+    END IF;
+END $$;
+
+-- Verify the constraint was added
+-- SELECT conname FROM pg_constraint 
+-- WHERE conname = 'uq_player_achievement_user_achievement';
@@ -0,0 +1,18 @@
+-- Migration: Copy users.xp into player_totals
+-- XP breaks ties on the achievements leaderboard. With it stored next to
+-- achievement_count, rank counts and neighbour lookups are ranges of one
+-- index instead of a scan of users. xp_service keeps the copy in step.
+
+ALTER TABLE player_totals ADD COLUMN IF NOT EXISTS xp INTEGER NOT NULL DEFAULT 0;
+
+UPDATE player_totals
+SET xp = COALESCE(users.xp, 0)
+FROM users
+WHERE users.id = player_totals.player_id;
+
+DROP INDEX IF EXISTS ix_player_totals_achievement_rank;
+CREATE INDEX ix_player_totals_achievement_rank ON player_totals (achievement_count DESC, xp DESC, player_id);
+
+-- Verify the column was filled in
+-- SELECT count(*) FROM player_totals JOIN users ON users.id = player_totals.player_id
+-- WHERE player_totals.xp <> COALESCE(users.xp, 0);
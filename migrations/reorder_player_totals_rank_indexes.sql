@@ -0,0 +1,17 @@
+-- Migration: Rank indexes in the leaderboards' ORDER BY directions
+-- Boards sort on the ranking column DESC and player_id ASC. An index on
+-- (column, player_id) ascending can only be walked as (DESC, DESC) or
+-- (ASC, ASC), so boards and neighbour lookups fell back to a sort.
+-- ix_player_totals_achievement_rank is left to add_xp_to_player_totals.sql,
+-- which builds it as (achievement_count DESC, xp DESC, player_id); this file
+-- sorts after it and must not replace it.
+
+DROP INDEX IF EXISTS ix_player_totals_rating_rank;
+DROP INDEX IF EXISTS ix_player_totals_trophy_rank;
+
+CREATE INDEX ix_player_totals_rating_rank ON player_totals (avg_rating DESC, player_id);
+CREATE INDEX ix_player_totals_trophy_rank ON player_totals (trophy_count DESC, player_id);
+
+-- Verify the index definitions
+-- SELECT indexname, indexdef FROM pg_indexes
+-- WHERE tablename = 'player_totals' AND indexname LIKE 'ix_player_totals_%_rank';
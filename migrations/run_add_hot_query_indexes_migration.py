@@ -0,0 +1,58 @@
+"""
+Migration script to add the composite indexes for the hot queries.
+Runs migrations/add_hot_query_indexes.sql statement by statement (CREATE INDEX
+CONCURRENTLY needs autocommit) and records the migration version in app_state,
+so running it again is a no-op.
+Run this script: python migrations/run_add_hot_query_indexes_migration.py
+"""
+import sys
+import os
+
+# Add parent directory to path to import database
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine, SessionLocal
+from models.app_state import AppState
+from services.startup_service import get_state, set_state
+
+MIGRATION_VERSION = "add_hot_query_indexes"
+SQL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "add_hot_query_indexes.sql")
+
+
+def _statements():
+    """SQL statements of the migration file (comments stripped)"""
+    with open(SQL_FILE, encoding="utf-8") as f:
+        lines = [line for line in f if not line.strip().startswith("--")]
+    return [s.strip() for s in "".join(lines).split(";") if s.strip()]
+
+
+def run_migration():
+    """Create the hot query indexes if this migration has not run yet."""
+    print(f"Running migration: {MIGRATION_VERSION}...")
+
+    AppState.__table__.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        if get_state(db, f"migration:{MIGRATION_VERSION}") == "applied":
+            print(f"✅ Migration '{MIGRATION_VERSION}' already applied. Skipping.")
+            return
+
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for statement in _statements():
+                print(f"  → {statement.splitlines()[0]}")
+                conn.exec_driver_sql(statement)
+
+        set_state(db, f"migration:{MIGRATION_VERSION}", "applied")
+        print(f"✅ Migration '{MIGRATION_VERSION}' applied!")
+
+    except Exception as e:
+        print(f"❌ Error running migration: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run_migration()
+    print("Migration complete!")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Enum, Boolean, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -30,3 +30,8 @@ class PlayerAchievement(Base):
 
     player = relationship("User", backref="achievements")
     achievement = relationship("Achievement", backref="players")
+
+    # One progress row per player and achievement (lets missing rows be bulk-inserted)
+    __table_args__ = (
+        UniqueConstraint('user_id', 'achievement_id', name='uq_player_achievement_user_achievement'),
+    )
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, DateTime
+from database import Base
+from datetime import datetime
+
+class AppState(Base):
+    """
+    Small key/value table for process-wide bookkeeping, e.g. the schema/seed
+    fingerprint the startup hook compares against (see services/startup_service.py).
+    """
+    __tablename__ = "app_state"
+
+    key = Column(String(100), primary_key=True)
+    value = Column(String(255), nullable=False)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
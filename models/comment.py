@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -18,3 +18,9 @@ class Comment(Base):
     author = relationship("User")
     news = relationship("News", backref="comments")
     match = relationship("Match", backref="comments")
+
+    # Comments of a news post / a match in posting order
+    __table_args__ = (
+        Index("ix_comments_news_created", "news_id", "created_at"),
+        Index("ix_comments_match_created", "match_id", "created_at"),
+    )
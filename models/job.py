@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from database import Base
+from datetime import datetime
+
+class Job(Base):
+    """
+    Durable background job (see services/job_queue.py).
+    Rows are written in the same transaction as the data they derive from, so
+    a restart never loses work; finished jobs are deleted, failed ones are kept.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)  # e.g. "stat_created"
+    payload = Column(Text, nullable=False, default="{}")  # JSON
+
+    status = Column(String(20), nullable=False, default="pending")  # "pending", "running", "failed"
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    owner = Column(String(100), nullable=True)  # process running the job (JobQueue.owner)
+    heartbeat_at = Column(DateTime, nullable=True)  # refreshed by the owner while the job runs
+    run_after = Column(DateTime, nullable=True)  # a failed job is not retried before this (None = right away)
+
+    # Workers claim the oldest pending job first
+    __table_args__ = (
+        Index("ix_jobs_status_id", "status", "id"),
+    )
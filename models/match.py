@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from database import Base
 from datetime import datetime
 
@@ -14,3 +14,8 @@ class Match(Base):
 
     winner_team = Column(String, nullable=True)  # "home", "away", "draw", or None
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Newest-first match list with (match_date, id) cursor pagination
+    __table_args__ = (
+        Index("ix_matches_date_id", "match_date", "id"),
+    )
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy.orm import relationship, backref
+from database import Base
+from datetime import datetime
+
+class MatchSummary(Base):
+    """
+    Per-match aggregates over the stats table, read by the match list.
+    Maintained by stat_service.create_stat (same transaction as the stat) and by
+    trophy_service (MVP), and rebuilt from scratch by scripts/rebuild_match_summaries.py.
+    A match without stats may have no row.
+    """
+    __tablename__ = "match_summaries"
+
+    match_id = Column(Integer, ForeignKey("matches.id"), primary_key=True)
+
+    player_count = Column(Integer, nullable=False, default=0)
+    home_player_count = Column(Integer, nullable=False, default=0)
+    away_player_count = Column(Integer, nullable=False, default=0)
+    home_rating_sum = Column(Float, nullable=False, default=0.0)
+    away_rating_sum = Column(Float, nullable=False, default=0.0)
+    home_avg_rating = Column(Float, nullable=True)  # home_rating_sum / home_player_count, rounded to 1 decimal (None without home players)
+    away_avg_rating = Column(Float, nullable=True)
+    total_goals = Column(Integer, nullable=False, default=0)
+
+    # Best player of the match (the trophy holder)
+    mvp_player_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    match = relationship("Match", backref=backref("summary", uselist=False))
+    mvp = relationship("User")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -15,3 +15,8 @@ class News(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     author = relationship("User", backref="news_posts")
+
+    # Newest-first news feed
+    __table_args__ = (
+        Index("ix_news_created_at", "created_at"),
+    )
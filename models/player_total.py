@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship, backref
+from database import Base
+from datetime import datetime
+
+class PlayerTotal(Base):
+    """
+    Per-player career aggregates over the stats table.
+    Maintained by stat_service.create_stat in the same transaction as the stat
+    itself, and rebuilt from scratch by scripts/rebuild_player_totals.py.
+    """
+    __tablename__ = "player_totals"
+
+    player_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    matches_played = Column(Integer, nullable=False, default=0)
+    total_goals = Column(Integer, nullable=False, default=0)
+    total_assists = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    avg_rating = Column(Float, nullable=False, default=0.0)  # rating_sum / matches_played, rounded to 1 decimal
+    max_goals_in_match = Column(Integer, nullable=False, default=0)
+
+    # Leaderboard ranking keys (kept in step by trophy_service and the achievement checker)
+    trophy_count = Column(Integer, nullable=False, default=0)
+    achievement_count = Column(Integer, nullable=False, default=0)  # unlocked achievements only
+    xp = Column(Integer, nullable=False, default=0)  # copy of users.xp (achievements board tiebreaker), kept in step by xp_service
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    player = relationship("User", backref=backref("totals", uselist=False))
+
+    # One index per leaderboard, in the board's ORDER BY directions, so boards and
+    # rank lookups only walk the players ranked ahead
+    __table_args__ = (
+        Index("ix_player_totals_rating_rank", avg_rating.desc(), player_id),
+        Index("ix_player_totals_achievement_rank", achievement_count.desc(), xp.desc(), player_id),
+        Index("ix_player_totals_trophy_rank", trophy_count.desc(), player_id),
+        # StatHub ranking sort modes (rating uses ix_player_totals_rating_rank)
+        Index("ix_player_totals_goals_rank", total_goals.desc(), player_id),
+        Index("ix_player_totals_assists_rank", total_assists.desc(), player_id),
+        Index("ix_player_totals_combined_rank", (total_goals + total_assists).desc(), player_id),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -18,3 +18,7 @@ class Rating(Base):
 
     player = relationship("User", backref="ratings")
     match = relationship("Match", backref="ratings")
+
+    __table_args__ = (
+        Index("ix_ratings_player_id", "player_id"),
+    )
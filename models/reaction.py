@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -20,3 +20,10 @@ class Reaction(Base):
     news = relationship("News", backref="reactions")
     comment = relationship("Comment", backref="reactions")
     match = relationship("Match", backref="reactions")
+
+    # Reaction counts per news post / match, and a user's reactions on a post
+    __table_args__ = (
+        Index("ix_reactions_news_type", "news_id", "type"),
+        Index("ix_reactions_match_type", "match_id", "type"),
+        Index("ix_reactions_user_news", "user_id", "news_id"),
+    )
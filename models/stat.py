@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, String
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, String, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -23,3 +23,9 @@ class Stat(Base):
     # Relationships
     match = relationship("Match", backref="stats")
     player = relationship("User", backref="stats")
+
+    # Player history / last-5 ratings, and match lineups split by team
+    __table_args__ = (
+        Index("ix_stats_player_created", "player_id", "created_at"),
+        Index("ix_stats_match_team", "match_id", "team"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -9,6 +9,7 @@ class Trophy(Base):
     id = Column(Integer, primary_key=True, index=True)
     match_id = Column(Integer, ForeignKey("matches.id"), nullable=False, unique=True)
     awarded_to = Column(Integer, ForeignKey("users.id"), nullable=False)
+    best_stat_id = Column(Integer, ForeignKey("stats.id"), nullable=True)  # Stat the trophy was awarded for
     date_awarded = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
@@ -17,4 +18,5 @@ class Trophy(Base):
     
     __table_args__ = (
         UniqueConstraint('match_id', name='uq_trophy_match_id'),
+        Index("ix_trophies_awarded_to", "awarded_to"),
     )
@@ -5,8 +5,10 @@ from core.security import get_current_user
 
 from schemas.achievement_schema import AchievementCreate, AchievementResponse
 from services.achievement_service import create_achievement
-from services.achievement_checker import check_and_unlock_achievements
-from models.achievement import Achievement, PlayerAchievement
+from services.achievement_checker import check_and_unlock_achievements, check_all_players_achievements
+from services.xp_service import update_user_xp_and_level
+from services.achievement_registry import achievement_registry
+from models.achievement import PlayerAchievement
 from models.user import User
 from scripts.seed_achievements import seed_achievements
 
@@ -22,7 +24,7 @@ def create(data: AchievementCreate, db: Session = Depends(get_db)):
 @router.get("/")
 def list_achievements(db: Session = Depends(get_db)):
     """Get all available achievements"""
-    achievements = db.query(Achievement).order_by(Achievement.tier, Achievement.target_value).all()
+    achievements = achievement_registry.all(db)
     return [
         {
             "id": a.id,
@@ -41,22 +43,16 @@ def list_achievements(db: Session = Depends(get_db)):
 def get_user_achievements(user_id: int, db: Session = Depends(get_db)):
     """
     Get a user's achievement progress.
-    Automatically checks and unlocks achievements based on current stats.
+    Read-only: progress is kept current when stats are stored
+    (POST /achievements/me/refresh re-evaluates on demand).
     """
     # Verify user exists
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Auto-check and unlock achievements based on stats
-    try:
-        check_and_unlock_achievements(db, user_id)
-    except Exception as e:
-        print(f"⚠️  Error auto-checking achievements for user {user_id}: {e}")
-        # Continue anyway - don't fail the request
-    
-    # Get all achievements
-    all_achievements = db.query(Achievement).order_by(Achievement.tier, Achievement.target_value).all()
+    # Get all achievements (ordered by tier, target_value)
+    all_achievements = achievement_registry.all(db)
     
     # Get user's progress on achievements
     user_progress = db.query(PlayerAchievement).filter(
@@ -96,7 +92,7 @@ def get_user_achievements(user_id: int, db: Session = Depends(get_db)):
 
 @router.get("/me")
 def get_my_achievements(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get current user's achievement progress (refreshes progress automatically)"""
+    """Get current user's achievement progress"""
     return get_user_achievements(current_user.id, db)
 
 
@@ -120,20 +116,11 @@ def check_all_users_achievements(current_user=Depends(get_current_user), db: Ses
         raise HTTPException(status_code=403, detail="Only admin can check achievements for all users")
     
     try:
-        # Get all players (non-admin users)
-        players = db.query(User).filter(User.role == "player").all()
-        
-        unlocked_count = 0
-        for player in players:
-            try:
-                if check_and_unlock_achievements(db, player.id):
-                    unlocked_count += 1
-            except Exception as e:
-                print(f"Error checking achievements for user {player.id}: {e}")
-                continue
+        # Evaluate every player (non-admin users) in one set-based pass
+        players_checked, unlocked_count = check_all_players_achievements(db)
         
         return {
-            "message": f"Checked achievements for {len(players)} players",
+            "message": f"Checked achievements for {players_checked} players",
             "players_with_new_achievements": unlocked_count
         }
     except Exception as e:
@@ -145,6 +132,9 @@ def refresh_my_achievements(current_user=Depends(get_current_user), db: Session
     """Refresh achievements for the current user (updates progress and unlocks if conditions are met)"""
     try:
         unlocked = check_and_unlock_achievements(db, current_user.id)
+        # Also re-sync stored XP (GET /users/me/xp only reads it)
+        if not unlocked:
+            update_user_xp_and_level(db, current_user.id)
         return {
             "message": "Achievements refreshed",
             "new_achievements_unlocked": unlocked
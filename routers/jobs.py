@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from database import get_db
+from core.security import get_current_user
+
+from services.job_queue import job_queue
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/metrics")
+def get_job_metrics(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
+    """Background job backlog and lag (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admin can view job metrics")
+    return job_queue.metrics(db)
@@ -1,35 +1,89 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
 from database import get_db
+from core.cache import leaderboard_cache, etag_matches
 from services.leaderboard_service import (
     get_leaderboard, 
     get_user_rank,
     get_achievements_leaderboard,
     get_trophies_leaderboard,
     get_user_achievement_rank,
-    get_user_trophy_rank
+    get_user_trophy_rank,
+    get_leaderboard_around_user,
+    get_all_leaderboards
 )
 from services.stathub_ranking_service import get_stathub_ranking
 
 router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
 
 
+def _cached(request: Request, response: Response, key, compute):
+    """
+    Serve a leaderboard from the versioned cache with an ETag.
+    Returns 304 Not Modified when the client already has the current version.
+    The database session is only used on a cache miss.
+    """
+    etag, value = leaderboard_cache.get_or_compute(key, compute)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return value
+
+
 @router.get("/")
-def leaderboard(limit: int = Query(1000, ge=1, le=1000), db: Session = Depends(get_db)):
+def leaderboard(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
     """Get the StatHub ranking leaderboard ranked by average StatHub rating. Includes ALL players, even with 0 rating."""
-    return get_leaderboard(db, limit)
+    return _cached(request, response, ("stathub", limit), lambda: get_leaderboard(db, limit))
 
 
 @router.get("/achievements")
-def achievements_leaderboard(limit: int = Query(1000, ge=1, le=1000), db: Session = Depends(get_db)):
+def achievements_leaderboard(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
     """Get the achievements leaderboard ranked by number of unlocked achievements. Includes ALL players, even with 0 achievements."""
-    return get_achievements_leaderboard(db, limit)
+    return _cached(request, response, ("achievements", limit), lambda: get_achievements_leaderboard(db, limit))
 
 
 @router.get("/trophies")
-def trophies_leaderboard(limit: int = Query(1000, ge=1, le=1000), db: Session = Depends(get_db)):
+def trophies_leaderboard(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
     """Get the trophies leaderboard ranked by number of trophies. Includes ALL players, even with 0 trophies."""
-    return get_trophies_leaderboard(db, limit)
+    return _cached(request, response, ("trophies", limit), lambda: get_trophies_leaderboard(db, limit))
+
+
+@router.get("/all")
+def all_leaderboards(
+    request: Request,
+    response: Response,
+    boards: str = Query("stathub,achievements,trophies,stathub-ranking", regex="^(stathub|achievements|trophies|stathub-ranking)(,(stathub|achievements|trophies|stathub-ranking))*$"),
+    limit: int = Query(1000, ge=1, le=1000),
+    sort_by: str = Query("rating", regex="^(rating|goals|assists|combined)$"),
+    ranking_limit: int = Query(50, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Get several leaderboards in one request, computed from a single scan of the player aggregates.
+    boards: comma-separated list of stathub, achievements, trophies, stathub-ranking.
+    sort_by / ranking_limit apply to stathub-ranking, limit to the other boards.
+    """
+    requested = tuple(dict.fromkeys(boards.split(",")))
+    return _cached(
+        request, response,
+        ("all", requested, limit, sort_by, ranking_limit),
+        lambda: get_all_leaderboards(db, requested, limit, sort_by, ranking_limit)
+    )
 
 
 @router.get("/user/{user_id}")
@@ -59,11 +113,27 @@ def user_trophy_rank(user_id: int, db: Session = Depends(get_db)):
     return result
 
 
+@router.get("/around/{user_id}")
+def leaderboard_around_user(
+    user_id: int,
+    radius: int = Query(2, ge=1, le=25),
+    board: str = Query("stathub", regex="^(stathub|achievements|trophies)$"),
+    db: Session = Depends(get_db)
+):
+    """Get the players ranked directly above and below a user (radius on each side), including the user"""
+    result = get_leaderboard_around_user(db, user_id, board, radius)
+    if not result:
+        return {"error": "User not found"}
+    return result
+
+
 @router.get("/stathub-ranking")
 def stathub_ranking(
+    request: Request,
+    response: Response,
     sort_by: str = Query("rating", regex="^(rating|goals|assists|combined)$"),
     limit: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
     """Get StatHub ranking sorted by rating, goals, assists, or combined (goals+assists)"""
-    return get_stathub_ranking(db, sort_by, limit)
+    return _cached(request, response, ("stathub-ranking", sort_by, limit), lambda: get_stathub_ranking(db, sort_by, limit))
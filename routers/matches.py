@@ -1,16 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+import io
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from typing import Optional
 from database import get_db
 from core.security import get_current_user
+from core.cache import make_etag, etag_matches
 
 from schemas.match_schema import MatchCreate, MatchResponse
-from services.match_service import create_match, list_matches, get_match
-from models.stat import Stat
-from models.match import Match
+from services.match_service import create_match, list_matches, list_matches_page, list_user_matches_page, get_match
+from services.match_detail_service import get_match_full
+from services.import_service import import_history, detect_format, ImportRecordError, ImportAbortedError
 
 router = APIRouter(prefix="/matches", tags=["Matches"])
 
+# Page size when a cursor is passed without a limit
+DEFAULT_PAGE_SIZE = 50
+
 
 @router.post("/", response_model=MatchResponse)
 def create_match_endpoint(
@@ -24,24 +29,61 @@ def create_match_endpoint(
     return create_match(db, data)
 
 
+@router.post("/import")
+def import_history_endpoint(
+    file: UploadFile = File(...),
+    format: str = None,
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Import historical matches and stats from a CSV or NDJSON upload (admin only).
+    The file is streamed line by line; see services/import_service.py for the format.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admin can import history")
+
+    try:
+        fmt = format or detect_format(file.filename)
+        lines = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+        return import_history(db, lines, fmt)
+    except ImportRecordError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImportAbortedError as e:
+        # Batches committed before the failure stay; the summary says what they were
+        if isinstance(e.__cause__, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail={"error": "File must be UTF-8 text", "summary": e.summary})
+        raise HTTPException(status_code=500, detail={"error": str(e), "summary": e.summary})
+
+
 @router.get("/")
-def list_matches_endpoint(db: Session = Depends(get_db)):
-    """Get all matches with team average ratings"""
-    matches = db.query(Match).order_by(Match.match_date.desc()).all()
+def list_matches_endpoint(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get matches (newest first) with team average ratings, MVP, player count and
+    total goals (read from the precomputed match summaries).
+    Without limit and cursor every match is returned, as before paging existed.
+    Paging is opt-in: with ?limit=... (or a cursor), when more matches exist the
+    X-Next-Cursor response header holds the cursor for the next page (?cursor=...).
+    """
+    if limit is None and cursor:
+        limit = DEFAULT_PAGE_SIZE
+    try:
+        rows, next_cursor = list_matches_page(db, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     result = []
-    for match in matches:
-        # Get average ratings for each team
-        home_stats = db.query(func.avg(Stat.rating)).filter(
-            Stat.match_id == match.id, 
-            Stat.team == "home"
-        ).scalar()
-        
-        away_stats = db.query(func.avg(Stat.rating)).filter(
-            Stat.match_id == match.id, 
-            Stat.team == "away"
-        ).scalar()
-        
+    for match, summary in rows:
+        # Matches without stats may not have a summary row yet
+        home_avg = summary.home_avg_rating if summary else None
+        away_avg = summary.away_avg_rating if summary else None
         result.append({
             "id": match.id,
             "home_team": match.home_team,
@@ -50,8 +92,11 @@ def list_matches_endpoint(db: Session = Depends(get_db)):
             "away_score": match.away_score,
             "match_date": match.match_date,
             "winner_team": match.winner_team,
-            "home_avg_rating": round(home_stats, 1) if home_stats else None,
-            "away_avg_rating": round(away_stats, 1) if away_stats else None,
+            "home_avg_rating": round(home_avg, 1) if home_avg else None,
+            "away_avg_rating": round(away_avg, 1) if away_avg else None,
+            "mvp_player_id": summary.mvp_player_id if summary else None,
+            "player_count": summary.player_count if summary else 0,
+            "total_goals": summary.total_goals if summary else 0,
         })
     
     return result
@@ -66,20 +111,60 @@ def get_match_endpoint(match_id: int, db: Session = Depends(get_db)):
     return match
 
 
+@router.get("/{match_id}/full")
+def get_match_full_endpoint(
+    match_id: int,
+    request: Request,
+    response: Response,
+    comment_limit: int = Query(20, ge=1, le=100),
+    comment_cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Everything the match page shows in one request: match, lineup, team average
+    ratings, trophy holder, reaction counts and a page of comments.
+    More comments: pass comments_next_cursor back as ?comment_cursor=...
+    Sends an ETag and returns 304 Not Modified when the client already has this page.
+    """
+    try:
+        full = get_match_full(db, match_id, comment_limit, comment_cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not full:
+        raise HTTPException(status_code=404, detail="Match not found")
+
+    # Comments and reactions are live, so the ETag covers the whole page
+    etag = make_etag(full)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return full
+
+
 @router.get("/user/{user_id}")
-def get_user_matches(user_id: int, db: Session = Depends(get_db)):
-    """Get all matches a user participated in"""
-    # Find match IDs where user has stats
-    user_stats = db.query(Stat).filter(Stat.player_id == user_id).all()
-    match_ids = [s.match_id for s in user_stats]
-    
-    # Get those matches
-    matches = db.query(Match).filter(Match.id.in_(match_ids)).order_by(Match.match_date.desc()).all()
+def get_user_matches(
+    user_id: int,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get matches a user participated in (newest first) with their stats.
+    Unpaged without limit and cursor; otherwise paginated like GET /matches/
+    (X-Next-Cursor header, ?cursor=...).
+    """
+    if limit is None and cursor:
+        limit = DEFAULT_PAGE_SIZE
+    try:
+        rows, next_cursor = list_user_matches_page(db, user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     result = []
-    for match in matches:
-        # Get user's stats for this match
-        user_stat = next((s for s in user_stats if s.match_id == match.id), None)
+    for match, goals, assists, rating in rows:
         result.append({
             "id": match.id,
             "home_team": match.home_team,
@@ -88,15 +173,21 @@ def get_user_matches(user_id: int, db: Session = Depends(get_db)):
             "away_score": match.away_score,
             "match_date": match.match_date,
             "winner_team": match.winner_team,
-            "player_goals": user_stat.goals if user_stat else 0,
-            "player_assists": user_stat.assists if user_stat else 0,
-            "player_rating": user_stat.rating if user_stat else 0,
+            "player_goals": goals,
+            "player_assists": assists,
+            "player_rating": rating,
         })
     
     return result
 
 
 @router.get("/me/history")
-def get_my_matches(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get current user's match history"""
-    return get_user_matches(current_user.id, db)
+def get_my_matches(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = None,
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get current user's match history (paginated like /matches/user/{user_id})"""
+    return get_user_matches(current_user.id, response, limit, cursor, db)
@@ -4,10 +4,14 @@ from database import get_db
 from core.security import get_current_user
 
 from schemas.stat_schema import StatCreate, StatResponse
-from services.stat_service import create_stat, get_stats_for_match, get_user_recent_performances, get_match_players_detailed
+from services.stat_service import create_stat, create_stats_bulk, get_stats_for_match, get_user_recent_performances, get_match_players_detailed
+from core.cache import lineup_cache
 
 router = APIRouter(prefix="/stats", tags=["Stats"])
 
+# A full match lineup with substitutes fits comfortably
+MAX_BULK_STATS = 100
+
 @router.post("/", response_model=StatResponse)
 def create_stat_endpoint(
     data: StatCreate, 
@@ -19,14 +23,34 @@ def create_stat_endpoint(
         raise HTTPException(status_code=403, detail="Only admin can create stats")
     return create_stat(db, data)
 
+@router.post("/bulk", response_model=list[StatResponse])
+def create_stats_bulk_endpoint(
+    data: list[StatCreate],
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Create a match lineup's stats in one request (achievements and trophy are evaluated once)"""
+    # Only admin can create stats
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admin can create stats")
+    if not data:
+        raise HTTPException(status_code=400, detail="No stats provided")
+    if len(data) > MAX_BULK_STATS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_STATS} stats per request")
+    return create_stats_bulk(db, data)
+
 @router.get("/match/{match_id}", response_model=list[StatResponse])
 def get_match_stats(match_id: int, db: Session = Depends(get_db)):
     return get_stats_for_match(db, match_id)
 
 @router.get("/match/{match_id}/players")
 def get_match_players(match_id: int, db: Session = Depends(get_db)):
-    """Get all players in a match with their details, sorted by jersey number"""
-    return get_match_players_detailed(db, match_id)
+    """Get all players in a match with their details, sorted by jersey number (cached until stats change)"""
+    _, lineup = lineup_cache.get_or_compute(
+        ("lineup", match_id),
+        lambda: get_match_players_detailed(db, match_id)
+    )
+    return lineup
 
 @router.get("/me/recent")
 def get_my_recent_performances(
@@ -4,10 +4,11 @@ from sqlalchemy import func
 from database import get_db
 from core.security import get_current_user
 from schemas.user_schema import UserResponse, UserUpdate
-from services.user_service import update_user, get_user_by_id
-from services.xp_service import get_user_xp_info, update_user_xp_and_level
+from services.user_service import update_user, get_user_by_id, invalidate_user_caches
+from services.xp_service import get_user_xp_info, recalculate_xp_for_users
+from services.player_totals_service import get_player_totals
+from core.cache import leaderboard_cache
 from models.user import User
-from models.stat import Stat
 from models.trophy import Trophy
 from models.achievement import PlayerAchievement
 import shutil
@@ -48,23 +49,26 @@ def upload_photo(
     file_name = f"{current_user.id}_{uuid.uuid4().hex[:8]}.{ext}"
     file_path = os.path.join(UPLOAD_DIR, file_name)
     
-    # Delete old photo if exists
-    if current_user.photo_url:
-        old_path = current_user.photo_url.lstrip("/")
-        if os.path.exists(old_path):
-            try:
-                os.remove(old_path)
-            except:
-                pass
-    
     # Save new photo
     with open(file_path, "wb") as buffer:
         shutil.copyfileobj(photo.file, buffer)
     
     # Update user's photo_url
+    old_photo_url = current_user.photo_url
     current_user.photo_url = f"/uploads/avatars/{file_name}"
     db.commit()
     db.refresh(current_user)
+    # Cached boards, lineups and match pages still point at the old photo
+    invalidate_user_caches()
+    
+    # Delete old photo if exists (only once nothing refers to it anymore)
+    if old_photo_url:
+        old_path = old_photo_url.lstrip("/")
+        if os.path.exists(old_path):
+            try:
+                os.remove(old_path)
+            except:
+                pass
     
     return current_user
 
@@ -95,12 +99,7 @@ def get_user_stats(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
 
     # Get aggregated stats
-    stats = db.query(
-        func.count(Stat.id).label("matches_played"),
-        func.coalesce(func.sum(Stat.goals), 0).label("total_goals"),
-        func.coalesce(func.sum(Stat.assists), 0).label("total_assists"),
-        func.coalesce(func.avg(Stat.rating), 0).label("avg_rating"),
-    ).filter(Stat.player_id == user_id).first()
+    totals = get_player_totals(db, user_id)
 
     # Get trophy count
     trophy_count = db.query(func.count(Trophy.id)).filter(Trophy.awarded_to == user_id).scalar()
@@ -113,10 +112,10 @@ def get_user_stats(user_id: int, db: Session = Depends(get_db)):
 
     return {
         "user_id": user_id,
-        "matches_played": stats.matches_played or 0,
-        "total_goals": stats.total_goals or 0,
-        "total_assists": stats.total_assists or 0,
-        "avg_rating": round(stats.avg_rating or 0, 1),
+        "matches_played": totals.matches_played if totals else 0,
+        "total_goals": totals.total_goals if totals else 0,
+        "total_assists": totals.total_assists if totals else 0,
+        "avg_rating": round(totals.avg_rating, 1) if totals else 0,
         "trophy_count": trophy_count or 0,
         "achievements_unlocked": unlocked_achievements or 0,
     }
@@ -124,9 +123,11 @@ def get_user_stats(user_id: int, db: Session = Depends(get_db)):
 
 @router.get("/me/xp")
 def get_my_xp_info(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get current user's XP and level information"""
-    # Ensure XP is up to date
-    update_user_xp_and_level(db, current_user.id)
+    """
+    Get current user's XP and level information.
+    Read-only: stored XP is kept current when achievements unlock
+    (POST /achievements/me/refresh re-syncs it on demand).
+    """
     return get_user_xp_info(db, current_user.id)
 
 
@@ -142,11 +143,9 @@ def recalculate_all_xp(current_user=Depends(get_current_user), db: Session = Dep
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admin can recalculate XP")
     
-    users = db.query(User).all()
-    updated = 0
-    for user in users:
-        update_user_xp_and_level(db, user.id)
-        updated += 1
+    # One UPDATE ... FROM (aggregate) for the whole league
+    updated = recalculate_xp_for_users(db)
+    leaderboard_cache.bump()
     
     return {"message": f"Recalculated XP for {updated} users"}
 
@@ -170,6 +169,8 @@ def make_admin(
     target_user.role = "admin"
     db.commit()
     db.refresh(target_user)
+    # Admins drop off the leaderboards
+    invalidate_user_caches()
     
     return {
         "message": f"User {target_user.username} is now an admin",
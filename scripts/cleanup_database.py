@@ -20,6 +20,7 @@ from models.reaction import Reaction
 from models.comment import Comment
 from models.trophy import Trophy
 from models.news import News
+from models.player_total import PlayerTotal
 
 def cleanup_database():
     """Delete all non-admin users and all matches from the database."""
@@ -46,6 +47,11 @@ def cleanup_database():
         db.query(Stat).delete()
         print(f"   ✓ Deleted {stats_count} stats")
         
+        # Delete player totals (aggregated from stats)
+        totals_count = db.query(PlayerTotal).count()
+        db.query(PlayerTotal).delete()
+        print(f"   ✓ Deleted {totals_count} player totals")
+        
         # Delete ratings (related to matches)
         ratings_count = db.query(Rating).count()
         db.query(Rating).delete()
@@ -0,0 +1,68 @@
+"""
+Import historical matches and stats from a CSV or NDJSON file.
+Records are streamed and written in batches; trophies, match summaries,
+player totals, achievements and XP are recomputed once at the end.
+
+    python scripts/import_history.py history.csv
+    python scripts/import_history.py history.ndjson --batch-size 5000
+
+See services/import_service.py for the record format.
+"""
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal
+from models.user import User  # Import to ensure relationships are set up
+from models.match import Match  # Import to ensure relationships are set up
+from models.stat import Stat  # Import to ensure relationships are set up
+from models.trophy import Trophy  # Import to ensure relationships are set up
+from services.import_service import import_history, detect_format, ImportAbortedError, DEFAULT_BATCH_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import historical matches and stats")
+    parser.add_argument("path", help="CSV or NDJSON file")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="records per transaction")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+
+    db = SessionLocal()
+    try:
+        with open(args.path, encoding="utf-8", newline="") as f:
+            summary = import_history(db, f, fmt, batch_size=args.batch_size)
+    except ImportAbortedError as e:
+        print(f"❌ {e}")
+        print(f"   Already committed: {e.summary['matches']} match(es), {e.summary['stats']} stat(s).")
+        if "recompute_error" in e.summary:
+            print(f"   ⚠️ Derived data not recomputed: {e.summary['recompute_error']}")
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Import failed: {e}")
+        raise
+    finally:
+        db.close()
+
+    print(f"✅ Imported {summary['matches']} match(es) and {summary['stats']} stat(s).")
+    if summary["skipped"]:
+        print(f"⚠️  Skipped {summary['skipped']} record(s):")
+        for error in summary["errors"]:
+            print(f"   - {error}")
+    if "recompute_error" in summary:
+        print(f"⚠️  Derived data not recomputed: {summary['recompute_error']}")
+    if "trophies_updated" in summary:
+        print(f"🏆 Trophies updated: {summary['trophies_updated']}")
+        print(f"🏅 Players with new achievements: {summary['players_with_new_achievements']}")
+
+
+if __name__ == "__main__":
+    print("📥 Importing history...")
+    print("=" * 60)
+    main()
+    print("=" * 60)
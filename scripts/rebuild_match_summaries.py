@@ -0,0 +1,41 @@
+"""
+Rebuild the match_summaries table from the stats and trophies tables.
+Run this after manual data fixes or if the aggregates ever drift:
+    python scripts/rebuild_match_summaries.py
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal, engine, Base
+from models.user import User  # Import to ensure relationships are set up
+from models.match import Match  # Import to ensure relationships are set up
+from models.stat import Stat  # Import to ensure relationships are set up
+from models.trophy import Trophy  # Import to ensure relationships are set up
+from models.match_summary import MatchSummary
+from services.match_summary_service import rebuild_match_summaries
+
+
+def main():
+    # Make sure the table exists before rebuilding it
+    Base.metadata.create_all(bind=engine, tables=[MatchSummary.__table__])
+
+    db = SessionLocal()
+    try:
+        count = rebuild_match_summaries(db)
+        print(f"✅ Rebuilt match summaries for {count} match(es).")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error rebuilding match summaries: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("🔄 Rebuilding match summaries...")
+    print("=" * 60)
+    main()
+    print("=" * 60)
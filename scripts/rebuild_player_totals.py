@@ -0,0 +1,40 @@
+"""
+Rebuild the player_totals table from the stats table.
+Run this after manual data fixes or if the aggregates ever drift:
+    python scripts/rebuild_player_totals.py
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal, engine, Base
+from models.user import User  # Import to ensure relationships are set up
+from models.match import Match  # Import to ensure relationships are set up
+from models.stat import Stat  # Import to ensure relationships are set up
+from models.player_total import PlayerTotal
+from services.player_totals_service import rebuild_player_totals
+
+
+def main():
+    # Make sure the table exists before rebuilding it
+    Base.metadata.create_all(bind=engine, tables=[PlayerTotal.__table__])
+
+    db = SessionLocal()
+    try:
+        count = rebuild_player_totals(db)
+        print(f"✅ Rebuilt player totals for {count} user(s).")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error rebuilding player totals: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("🔄 Rebuilding player totals...")
+    print("=" * 60)
+    main()
+    print("=" * 60)
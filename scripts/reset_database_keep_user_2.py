@@ -129,6 +129,7 @@ def reset_database_keep_user_2():
         import models.comment
         import models.reaction
         import models.achievement
+        import models.player_total
         
         # Create all tables
         Base.metadata.create_all(bind=engine)
@@ -15,11 +15,13 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy.orm import Session
 from database import SessionLocal
-from models.achievement import Achievement
+from models.achievement import Achievement, PlayerAchievement
 from models.user import User
 from models.stat import Stat  # Import to ensure relationships are set up
 from models.match import Match  # Import to ensure relationships are set up
-from services.achievement_checker import check_and_unlock_achievements
+from services.achievement_checker import check_all_players_achievements
+from services.xp_service import recalculate_xp_for_users
+from services.achievement_registry import achievement_registry
 
 # Define all achievements exactly as specified
 ACHIEVEMENTS = [
@@ -123,6 +125,7 @@ def seed_achievements(db: Session = None, check_existing_players: bool = True):
         existing_achievements = {a.name: a for a in db.query(Achievement).all()}
         new_achievements_count = 0
         updated_achievements_count = 0
+        repriced_achievement_ids = []
         
         # Create or update achievements
         for ach_data in ACHIEVEMENTS:
@@ -133,6 +136,7 @@ def seed_achievements(db: Session = None, check_existing_players: bool = True):
                 
                 if existing.points != ach_data["points"]:
                     existing.points = ach_data["points"]
+                    repriced_achievement_ids.append(existing.id)
                     updated = True
                 if existing.description != ach_data["description"]:
                     existing.description = ach_data["description"]
@@ -165,6 +169,7 @@ def seed_achievements(db: Session = None, check_existing_players: bool = True):
         # Commit changes
         if new_achievements_count > 0 or updated_achievements_count > 0:
             db.commit()
+            achievement_registry.invalidate()
             if new_achievements_count > 0:
                 print(f"✅ Successfully seeded {new_achievements_count} new achievement(s)!")
             if updated_achievements_count > 0:
@@ -172,23 +177,31 @@ def seed_achievements(db: Session = None, check_existing_players: bool = True):
         else:
             print("ℹ️  All achievements already exist in database with correct values.")
         
+        # Stored XP is only refreshed on unlock, so re-sync holders of re-priced achievements
+        if repriced_achievement_ids:
+            holder_ids = [
+                row.user_id for row in
+                db.query(PlayerAchievement.user_id)
+                .filter(
+                    PlayerAchievement.achievement_id.in_(repriced_achievement_ids),
+                    PlayerAchievement.unlocked == True
+                )
+                .distinct()
+                .all()
+            ]
+            if holder_ids:
+                recalculate_xp_for_users(db, holder_ids)
+                print(f"✅ Recalculated XP for {len(holder_ids)} player(s) after point changes.")
+        
         # Check existing players for achievements they may have already earned
         if check_existing_players:
             print("\n🔍 Checking existing players for achievements...")
-            players = db.query(User).filter(User.role == "player").all()
-            unlocked_count = 0
-            for player in players:
-                try:
-                    if check_and_unlock_achievements(db, player.id):
-                        unlocked_count += 1
-                except Exception as e:
-                    print(f"⚠️  Error checking achievements for user {player.id}: {e}")
-                    continue
+            players_checked, unlocked_count = check_all_players_achievements(db)
             
             if unlocked_count > 0:
-                print(f"✅ Checked {len(players)} players. {unlocked_count} player(s) had new achievements unlocked.")
+                print(f"✅ Checked {players_checked} players. {unlocked_count} player(s) had new achievements unlocked.")
             else:
-                print(f"ℹ️  Checked {len(players)} players. No new achievements unlocked.")
+                print(f"ℹ️  Checked {players_checked} players. No new achievements unlocked.")
         
         return (new_achievements_count, updated_achievements_count)
         
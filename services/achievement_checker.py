@@ -1,176 +1,463 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, or_, update
 from datetime import datetime, timezone
 from models.achievement import Achievement, PlayerAchievement
 from models.stat import Stat
-from services.xp_service import update_user_xp_and_level
+from models.user import User
+from models.player_total import PlayerTotal
+from services.xp_service import update_user_xp_and_level, recalculate_xp_for_users
+from services.player_totals_service import get_player_totals, adjust_achievement_count, add_achievement_counts
+from services.achievement_registry import achievement_registry
+from core.cache import leaderboard_cache
+from utils.upsert import dialect_insert
+
+# Rows per multi-row INSERT / IN list in the set-based checker (bind parameter limits)
+CHUNK_SIZE = 500
+
+
+def _chunks(items):
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+def _rating_average(ratings) -> float:
+    """Average of a player's most recent ratings (newest first), even if fewer than 5"""
+    if len(ratings) == 0:
+        return 0.0
+    return sum(ratings) / len(ratings)
+
+
+def evaluate_achievement(achievement: Achievement, metrics: dict):
+    """
+    Work out a player's progress on one achievement.
+
+    metrics holds the player's matches_played, total_goals, total_assists,
+    max_goals_in_match, recent_ratings (last 5 ratings, newest first) and
+    current_match_goals (None unless a specific stat is being checked).
+
+    Returns (current_value, should_unlock).
+    """
+    target_value = achievement.target_value
+
+    # Track achievements by metric instead of name - this supports custom achievements
+    if achievement.metric == "matches":
+        return metrics["matches_played"], metrics["matches_played"] >= target_value
+
+    elif achievement.metric == "assists":
+        return metrics["total_assists"], metrics["total_assists"] >= target_value
+
+    elif achievement.metric == "goals":
+        return metrics["total_goals"], metrics["total_goals"] >= target_value
+
+    elif achievement.metric == "goals_per_match":
+        # Check if player scored target_value+ goals in any single match
+        # Use current match goals if available, otherwise use max from all matches
+        current_match_goals = metrics["current_match_goals"]
+        if current_match_goals is not None and current_match_goals >= target_value:
+            return current_match_goals, True
+        return metrics["max_goals_in_match"], metrics["max_goals_in_match"] >= target_value
+
+    elif achievement.metric == "rating":
+        # For rating-based achievements, check average rating
+        # Note: target_value is Integer in DB. For 7.5 rating, you can store as 75 (divide by 10) or 7/8
+        # We'll handle both: if target_value > 10, assume it's stored as integer*10 (e.g., 75 for 7.5)
+        # Otherwise, compare directly
+        if target_value > 10:
+            # Stored as integer*10 (e.g., 75 for 7.5)
+            target_rating = target_value / 10.0
+        else:
+            # Stored as integer (e.g., 7 for 7.0, 8 for 8.0)
+            target_rating = float(target_value)
+
+        recent_ratings = metrics["recent_ratings"]
+        avg_rating_last_5 = _rating_average(recent_ratings)
+
+        # Special handling for "Elite Performer" which requires 5+ matches
+        if achievement.name == "Elite Performer":
+            # Elite Performer: requires 5+ matches AND rating >= target
+            if len(recent_ratings) >= 5:
+                # Store rating as integer*10 (e.g., 75 for 7.5) to match target_value format
+                current_value = int(round(avg_rating_last_5 * 10))
+            else:
+                current_value = 0
+            # Only unlock if user has 5+ matches AND average meets target
+            return current_value, len(recent_ratings) >= 5 and avg_rating_last_5 >= target_rating
+
+        # Generic rating achievement: check average rating across all matches
+        if len(recent_ratings) > 0:
+            # Store rating as integer*10 (e.g., 75 for 7.5) to match target_value format
+            return int(round(avg_rating_last_5 * 10)), avg_rating_last_5 >= target_rating
+        return 0, False
+
+    # Unknown metric - log a warning but don't skip (might be a future metric)
+    print(f"Warning: Unknown achievement metric '{achievement.metric}' for achievement '{achievement.name}' - cannot track progress")
+    # Set current_value to 0 but don't unlock
+    return 0, False
+
+
+def _player_metrics(db: Session, user_id: int, current_match_goals=None, with_ratings: bool = True) -> dict:
+    """Metrics evaluate_achievement needs for one player (ratings query only when asked for)"""
+    # Get user's aggregated stats (maintained incrementally in player_totals)
+    totals = get_player_totals(db, user_id)
+
+    # Get ratings of the last 5 matches (newest first)
+    recent_ratings = []
+    if with_ratings:
+        recent_ratings = [
+            r.rating for r in
+            db.query(Stat.rating)
+            .filter(Stat.player_id == user_id)
+            .order_by(Stat.created_at.desc(), Stat.id.desc())
+            .limit(5)
+            .all()
+        ]
+
+    return {
+        "matches_played": totals.matches_played if totals else 0,
+        "total_goals": totals.total_goals if totals else 0,
+        "total_assists": totals.total_assists if totals else 0,
+        "max_goals_in_match": totals.max_goals_in_match if totals else 0,
+        "recent_ratings": recent_ratings,
+        "current_match_goals": current_match_goals,
+    }
+
+
+def _locked_achievements(db: Session, user_id: int, achievements):
+    """
+    Load the user's progress rows for `achievements` in one query, keyed by achievement_id,
+    and return (progress, pending) where pending skips already unlocked achievements.
+    """
+    query = db.query(PlayerAchievement).filter(PlayerAchievement.user_id == user_id)
+    if len(achievements) < len(achievement_registry.all(db)):
+        query = query.filter(PlayerAchievement.achievement_id.in_([a.id for a in achievements]))
+    progress = {pa.achievement_id: pa for pa in query.all()}
+
+    pending = [
+        a for a in achievements
+        if not (a.id in progress and progress[a.id].unlocked)
+    ]
+    return progress, pending
+
+
+def _apply_progress(db: Session, user_id: int, pending, progress: dict, metrics: dict) -> bool:
+    """Evaluate pending achievements, store progress and unlocks, and commit"""
+    now = datetime.now(timezone.utc)
+    new_rows = []
+    newly_unlocked_count = 0
+
+    for achievement in pending:
+        # Check achievement conditions based on metric (not name) - this allows custom achievements
+        current_value, should_unlock = evaluate_achievement(achievement, metrics)
+
+        player_achievement = progress.get(achievement.id)
+
+        if not player_achievement:
+            # Missing progress rows are bulk-inserted below
+            new_rows.append({
+                "user_id": user_id,
+                "achievement_id": achievement.id,
+                "current_value": current_value,
+                "unlocked": should_unlock,
+                "unlocked_at": now if should_unlock else None,
+            })
+            continue
+
+        if not should_unlock:
+            # Update current value
+            player_achievement.current_value = current_value
+            continue
+
+        # Unlock only if the row is still locked: when a concurrent check got
+        # there first nothing is updated and the unlock isn't counted twice
+        unlocked = (
+            db.query(PlayerAchievement)
+            .filter(PlayerAchievement.id == player_achievement.id, or_(
+                PlayerAchievement.unlocked.is_(False), PlayerAchievement.unlocked.is_(None)
+            ))
+            .update(
+                {
+                    PlayerAchievement.current_value: current_value,
+                    PlayerAchievement.unlocked: True,
+                    PlayerAchievement.unlocked_at: now,
+                },
+                synchronize_session=False,
+            )
+        )
+        if unlocked:
+            newly_unlocked_count += 1
+            print(f"✅ Achievement unlocked: {achievement.name} for user {user_id}")
+
+    if new_rows:
+        # uq_player_achievement_user_achievement makes a concurrent check for the
+        # same user a no-op instead of a duplicate; only rows we inserted count
+        inserted = db.execute(
+            dialect_insert(db, PlayerAchievement)
+            .values(new_rows)
+            .on_conflict_do_nothing(index_elements=["user_id", "achievement_id"])
+            .returning(PlayerAchievement.achievement_id, PlayerAchievement.unlocked)
+        ).all()
+        names = {a.id: a.name for a in pending}
+        for row in inserted:
+            if row.unlocked:
+                newly_unlocked_count += 1
+                print(f"✅ Achievement unlocked: {names[row.achievement_id]} for user {user_id}")
+
+    achievement_unlocked = newly_unlocked_count > 0
+
+    # Keep the achievements leaderboard key in step
+    if newly_unlocked_count:
+        adjust_achievement_count(db, user_id, newly_unlocked_count)
+
+    # Commit all changes at once
+    db.commit()
+
+    # Update user XP and level if an achievement was unlocked
+    if achievement_unlocked:
+        update_user_xp_and_level(db, user_id)
+        leaderboard_cache.bump()
+
+    return achievement_unlocked
 
 
 def check_and_unlock_achievements(db: Session, user_id: int, current_stat_id: int = None):
     """
     Check all achievements for a user based on their current stats and unlock them if conditions are met.
-    This should be called after stats are created or updated.
-    
+    Full re-evaluation - new stats go through check_achievements_for_new_stat instead.
+
     Args:
         db: Database session
         user_id: User ID to check achievements for
         current_stat_id: Optional stat ID that was just created/updated (for checking match-specific achievements)
     """
-    # Get user's aggregated stats
-    stats_query = (
-        db.query(
-            func.sum(Stat.goals).label("total_goals"),
-            func.sum(Stat.assists).label("total_assists"),
-            func.avg(Stat.rating).label("avg_rating"),
-            func.count(Stat.id).label("matches_played"),
-            func.max(Stat.goals).label("max_goals_in_match")
-        )
-        .filter(Stat.player_id == user_id)
-        .first()
-    )
-    
-    total_goals = stats_query.total_goals or 0
-    total_assists = stats_query.total_assists or 0
-    matches_played = stats_query.matches_played or 0
-    max_goals_in_match = stats_query.max_goals_in_match or 0
-    
+    # Get all achievement definitions (cached in memory)
+    all_achievements = achievement_registry.all(db)
+
+    if not all_achievements:
+        print(f"No achievements found in database. Please seed achievements first.")
+        return False
+
+    progress, pending = _locked_achievements(db, user_id, all_achievements)
+    if not pending:
+        return False
+
     # Get goals in current match if stat_id is provided
-    current_match_goals = 0
+    current_match_goals = None
     if current_stat_id:
         current_stat = db.query(Stat).filter(Stat.id == current_stat_id).first()
-        if current_stat:
-            current_match_goals = current_stat.goals or 0
-    
-    # Get average rating across last 5 matches
-    recent_matches = (
-        db.query(Stat.rating)
-        .filter(Stat.player_id == user_id)
-        .order_by(Stat.created_at.desc())
-        .limit(5)
-        .all()
+        current_match_goals = (current_stat.goals or 0) if current_stat else 0
+
+    metrics = _player_metrics(db, user_id, current_match_goals)
+    return _apply_progress(db, user_id, pending, progress, metrics)
+
+
+def metrics_moved_by_stat(stat: Stat):
+    """Achievement metrics whose value can change when `stat` is added"""
+    # Every stat is one more match and shifts the last-5 rating window
+    moved = {"matches", "rating"}
+    if stat.goals:
+        moved.update(("goals", "goals_per_match"))
+    if stat.assists:
+        moved.add("assists")
+    return moved
+
+
+def check_achievements_for_new_stat(db: Session, stat: Stat):
+    """
+    Delta version of check_and_unlock_achievements for a stat that was just inserted.
+
+    Running counters are already up to date in player_totals (apply_stat_to_totals),
+    so only locked achievements whose metric this stat could have moved are loaded
+    and evaluated, and the ratings window is only read if one of them is rating-based.
+    """
+    return check_achievements_for_new_stats(db, stat.player_id, [stat])
+
+
+def check_achievements_for_new_stats(db: Session, user_id: int, stats):
+    """check_achievements_for_new_stat for several new stats of one player, evaluated once"""
+    moved = set()
+    for stat in stats:
+        moved |= metrics_moved_by_stat(stat)
+
+    candidates = [
+        achievement
+        for metric in moved
+        for achievement in achievement_registry.for_metric(db, metric)
+    ]
+    if not candidates:
+        return False
+
+    progress, pending = _locked_achievements(db, user_id, candidates)
+    if not pending:
+        return False
+
+    metrics = _player_metrics(
+        db,
+        user_id,
+        current_match_goals=max((stat.goals or 0) for stat in stats),
+        with_ratings=any(a.metric == "rating" for a in pending),
     )
-    
-    avg_rating_last_5 = 0.0
-    if len(recent_matches) > 0:
-        # Calculate average rating of available matches (even if < 5)
-        avg_rating_last_5 = sum(r.rating for r in recent_matches) / len(recent_matches)
-    
-    # Get all achievements
-    all_achievements = db.query(Achievement).all()
-    
+    return _apply_progress(db, user_id, pending, progress, metrics)
+
+
+def check_all_players_achievements(db: Session, achievements=None, player_ids=None):
+    """
+    Set-based version of check_and_unlock_achievements for every player at once.
+    achievements: only evaluate these achievements (None = every achievement in the registry)
+    player_ids: only check these players (None = every player)
+
+    Loads the players' aggregates, their last 5 ratings, all achievements and all
+    existing progress rows in four queries, then bulk-inserts missing progress
+    rows, bulk-updates changed ones and recalculates XP for the players who
+    unlocked something in a single statement.
+
+    Safe to run next to check_stat_achievements jobs (and another instance of
+    itself): inserts skip rows that already exist, unlocks only apply to rows
+    that are still locked, and only the rows this call actually inserted or
+    unlocked are added to achievement_count.
+
+    Returns (players_checked, players_with_new_achievements).
+    """
+    all_achievements = achievement_registry.all(db) if achievements is None else achievements
+
     if not all_achievements:
         print(f"No achievements found in database. Please seed achievements first.")
-        return False
-    
-    achievement_unlocked = False
-    
-    for achievement in all_achievements:
-        # Get or create player achievement record
-        player_achievement = (
-            db.query(PlayerAchievement)
-            .filter(
-                PlayerAchievement.user_id == user_id,
-                PlayerAchievement.achievement_id == achievement.id
-            )
-            .first()
+        return 0, 0
+
+    # Aggregates for every player
+    players = (
+        db.query(
+            User.id,
+            PlayerTotal.matches_played,
+            PlayerTotal.total_goals,
+            PlayerTotal.total_assists,
+            PlayerTotal.max_goals_in_match,
         )
-        
-        if not player_achievement:
-            player_achievement = PlayerAchievement(
-                user_id=user_id,
-                achievement_id=achievement.id,
-                current_value=0,
-                unlocked=False
-            )
-            db.add(player_achievement)
-        
-        # Skip if already unlocked
-        if player_achievement.unlocked:
-            continue
-        
-        # Check achievement conditions based on metric (not name) - this allows custom achievements
-        should_unlock = False
-        current_value = 0
-        target_value = achievement.target_value
-        
-        # Track achievements by metric instead of name - this supports custom achievements
-        if achievement.metric == "matches":
-            current_value = matches_played
-            should_unlock = matches_played >= target_value
-        
-        elif achievement.metric == "assists":
-            current_value = total_assists
-            should_unlock = total_assists >= target_value
-        
-        elif achievement.metric == "goals":
-            current_value = total_goals
-            should_unlock = total_goals >= target_value
-        
-        elif achievement.metric == "goals_per_match":
-            # Check if player scored target_value+ goals in any single match
-            # Use current match goals if available, otherwise use max from all matches
-            if current_stat_id and current_match_goals >= target_value:
-                current_value = current_match_goals
-                should_unlock = True
-            else:
-                current_value = max_goals_in_match
-                should_unlock = max_goals_in_match >= target_value
-        
-        elif achievement.metric == "rating":
-            # For rating-based achievements, check average rating
-            # Note: target_value is Integer in DB. For 7.5 rating, you can store as 75 (divide by 10) or 7/8
-            # We'll handle both: if target_value > 10, assume it's stored as integer*10 (e.g., 75 for 7.5)
-            # Otherwise, compare directly
-            if target_value > 10:
-                # Stored as integer*10 (e.g., 75 for 7.5)
-                target_rating = target_value / 10.0
-            else:
-                # Stored as integer (e.g., 7 for 7.0, 8 for 8.0)
-                target_rating = float(target_value)
-            
-            # Special handling for "Elite Performer" which requires 5+ matches
-            if achievement.name == "Elite Performer":
-                # Elite Performer: requires 5+ matches AND rating >= target
-                if len(recent_matches) >= 5:
-                    # Store rating as integer*10 (e.g., 75 for 7.5) to match target_value format
-                    current_value = int(round(avg_rating_last_5 * 10))
-                else:
-                    current_value = 0
-                # Only unlock if user has 5+ matches AND average meets target
-                should_unlock = len(recent_matches) >= 5 and avg_rating_last_5 >= target_rating
-            else:
-                # Generic rating achievement: check average rating across all matches
-                if len(recent_matches) > 0:
-                    # Store rating as integer*10 (e.g., 75 for 7.5) to match target_value format
-                    current_value = int(round(avg_rating_last_5 * 10))
-                    should_unlock = avg_rating_last_5 >= target_rating
-                else:
-                    current_value = 0
-                    should_unlock = False
-        
-        else:
-            # Unknown metric - log a warning but don't skip (might be a future metric)
-            print(f"Warning: Unknown achievement metric '{achievement.metric}' for achievement '{achievement.name}' - cannot track progress")
-            # Set current_value to 0 but don't unlock
-            current_value = 0
-            should_unlock = False
-        
-        # Update current value
-        player_achievement.current_value = current_value
-        
-        # Unlock if condition is met
-        if should_unlock and not player_achievement.unlocked:
-            player_achievement.unlocked = True
-            player_achievement.unlocked_at = datetime.now(timezone.utc)
-            achievement_unlocked = True
-            print(f"✅ Achievement unlocked: {achievement.name} for user {user_id}")
-    
-    # Commit all changes at once
+        .outerjoin(PlayerTotal, User.id == PlayerTotal.player_id)
+        .filter(User.role == "player")
+    )
+    if player_ids is not None:
+        players = players.filter(User.id.in_(player_ids))
+    players = players.all()
+
+    # Last 5 ratings of every player (newest first)
+    ranked_stats = db.query(
+        Stat.player_id,
+        Stat.rating,
+        func.row_number().over(
+            partition_by=Stat.player_id,
+            order_by=(Stat.created_at.desc(), Stat.id.desc())
+        ).label("position")
+    )
+    if player_ids is not None:
+        ranked_stats = ranked_stats.filter(Stat.player_id.in_(player_ids))
+    ranked_stats = ranked_stats.subquery()
+    recent_ratings = {}
+    for row in (
+        db.query(ranked_stats.c.player_id, ranked_stats.c.rating)
+        .filter(ranked_stats.c.position <= 5)
+        .order_by(ranked_stats.c.player_id, ranked_stats.c.position)
+        .all()
+    ):
+        recent_ratings.setdefault(row.player_id, []).append(row.rating)
+
+    # Existing progress rows, keyed by (user_id, achievement_id)
+    progress_query = db.query(
+        PlayerAchievement.id,
+        PlayerAchievement.user_id,
+        PlayerAchievement.achievement_id,
+        PlayerAchievement.current_value,
+        PlayerAchievement.unlocked,
+    )
+    if player_ids is not None:
+        progress_query = progress_query.filter(PlayerAchievement.user_id.in_(player_ids))
+    progress = {(p.user_id, p.achievement_id): p for p in progress_query.all()}
+
+    now = datetime.now(timezone.utc)
+    new_rows = []
+    changed_rows = []
+    unlocks = {}  # achievement_id -> user ids to unlock
+
+    for player in players:
+        metrics = {
+            "matches_played": player.matches_played or 0,
+            "total_goals": player.total_goals or 0,
+            "total_assists": player.total_assists or 0,
+            "max_goals_in_match": player.max_goals_in_match or 0,
+            "recent_ratings": recent_ratings.get(player.id, []),
+            "current_match_goals": None,
+        }
+
+        for achievement in all_achievements:
+            existing = progress.get((player.id, achievement.id))
+
+            # Skip if already unlocked
+            if existing and existing.unlocked:
+                continue
+
+            current_value, should_unlock = evaluate_achievement(achievement, metrics)
+
+            if not existing:
+                new_rows.append({
+                    "user_id": player.id,
+                    "achievement_id": achievement.id,
+                    "current_value": current_value,
+                    "unlocked": should_unlock,
+                    "unlocked_at": now if should_unlock else None,
+                })
+                continue
+
+            if existing.current_value != current_value:
+                changed_rows.append({"id": existing.id, "current_value": current_value})
+            if should_unlock:
+                unlocks.setdefault(achievement.id, []).append(player.id)
+
+    # player_id -> achievements this call unlocked
+    unlocked_counts = {}
+
+    # uq_player_achievement_user_achievement turns rows a concurrent check
+    # inserted first into no-ops; only rows we inserted come back
+    for chunk in _chunks(new_rows):
+        inserted = db.execute(
+            dialect_insert(db, PlayerAchievement)
+            .values(chunk)
+            .on_conflict_do_nothing(index_elements=["user_id", "achievement_id"])
+            .returning(PlayerAchievement.user_id, PlayerAchievement.unlocked)
+        ).all()
+        for row in inserted:
+            if row.unlocked:
+                unlocked_counts[row.user_id] = unlocked_counts.get(row.user_id, 0) + 1
+
+    if changed_rows:
+        db.bulk_update_mappings(PlayerAchievement, changed_rows)
+
+    # Unlock only rows that are still locked; a row a concurrent check unlocked
+    # first isn't returned and isn't counted again
+    for achievement_id, user_ids in unlocks.items():
+        for chunk in _chunks(sorted(user_ids)):
+            unlocked = db.execute(
+                update(PlayerAchievement)
+                .where(
+                    PlayerAchievement.achievement_id == achievement_id,
+                    PlayerAchievement.user_id.in_(chunk),
+                    or_(PlayerAchievement.unlocked.is_(False), PlayerAchievement.unlocked.is_(None)),
+                )
+                .values(unlocked=True, unlocked_at=now)
+                .returning(PlayerAchievement.user_id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            for row in unlocked:
+                unlocked_counts[row.user_id] = unlocked_counts.get(row.user_id, 0) + 1
+
+    # Keep the achievements leaderboard key in step (players without a totals row get one)
+    if unlocked_counts:
+        add_achievement_counts(db, unlocked_counts)
+
     db.commit()
-    
-    # Update user XP and level if an achievement was unlocked
-    if achievement_unlocked:
-        update_user_xp_and_level(db, user_id)
-    
-    return achievement_unlocked
 
+    # Update XP and level of everyone who unlocked something, in one statement
+    if unlocked_counts:
+        recalculate_xp_for_users(db, list(unlocked_counts))
+        leaderboard_cache.bump()
+        print(f"✅ Achievements unlocked for {len(unlocked_counts)} player(s)")
+
+    return len(players), len(unlocked_counts)
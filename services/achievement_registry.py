@@ -0,0 +1,92 @@
+"""
+Process-local registry of achievement definitions.
+Definitions only change when achievements are created or seeded, so the
+unlock path reads them from memory instead of re-querying the table.
+create_achievement and seed_achievements call invalidate() after they commit;
+the TTL bounds staleness for definitions changed by another worker process.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.achievement import Achievement
+
+
+@dataclass(frozen=True)
+class AchievementDefinition:
+    """Immutable snapshot of an Achievement row (safe to share across sessions)"""
+    id: int
+    name: str
+    description: str
+    tier: str
+    points: int
+    target_value: int
+    metric: Optional[str]
+    created_at: Optional[datetime]
+
+
+class AchievementRegistry:
+    def __init__(self, ttl: int = 300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._definitions = []  # ordered by tier, target_value
+        self._by_id = {}
+        self._by_metric = {}
+
+    def invalidate(self):
+        """Drop the loaded definitions (call it after committing a change to achievements)"""
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self, db: Session):
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at <= self.ttl:
+                return
+            rows = (
+                db.query(Achievement)
+                .order_by(Achievement.tier, Achievement.target_value, Achievement.id)
+                .all()
+            )
+            definitions = [
+                AchievementDefinition(
+                    id=a.id,
+                    name=a.name,
+                    description=a.description,
+                    tier=a.tier,
+                    points=a.points,
+                    target_value=a.target_value,
+                    metric=a.metric,
+                    created_at=a.created_at,
+                )
+                for a in rows
+            ]
+            by_metric = {}
+            for definition in definitions:
+                by_metric.setdefault(definition.metric, []).append(definition)
+            self._definitions = definitions
+            self._by_id = {d.id: d for d in definitions}
+            self._by_metric = by_metric
+            self._loaded_at = time.monotonic()
+
+    def all(self, db: Session):
+        """Every achievement definition, ordered by tier then target_value"""
+        self._ensure_loaded(db)
+        return self._definitions
+
+    def get(self, db: Session, achievement_id: int):
+        self._ensure_loaded(db)
+        return self._by_id.get(achievement_id)
+
+    def for_metric(self, db: Session, metric: str):
+        """Definitions tracked by `metric` (empty list if none)"""
+        self._ensure_loaded(db)
+        return self._by_metric.get(metric, [])
+
+
+achievement_registry = AchievementRegistry(ttl=settings.ACHIEVEMENT_REGISTRY_TTL)
@@ -2,6 +2,11 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 from models.achievement import Achievement, PlayerAchievement
 from services.xp_service import update_user_xp_and_level
+from services.player_totals_service import adjust_achievement_count
+from services.achievement_registry import achievement_registry
+from services.achievement_checker import check_all_players_achievements
+from services.job_queue import enqueue, job_handler, job_queue
+from core.cache import leaderboard_cache
 
 def create_achievement(db: Session, data):
     ach = Achievement(
@@ -13,14 +18,36 @@ def create_achievement(db: Session, data):
         points=data.points,
     )
     db.add(ach)
+    db.flush()
+
+    # Players who already meet it are unlocked in the background
+    # (the job is committed with the achievement so it survives a restart)
+    enqueue(db, "check_new_achievement", {"achievement_id": ach.id})
+
     db.commit()
     db.refresh(ach)
+    achievement_registry.invalidate()
+    job_queue.notify()
     return ach
 
 
+@job_handler("check_new_achievement")
+def check_new_achievement_job(db: Session, payload: dict):
+    """Evaluate a newly created achievement for every existing player"""
+    # Read from the database: the registry of the process running the job may
+    # not have seen the new achievement yet
+    ach = db.query(Achievement).filter(Achievement.id == payload["achievement_id"]).first()
+    if ach is None:
+        # Not visible yet; fail so the job is retried
+        raise ValueError(f"Achievement {payload['achievement_id']} not found")
+
+    players_checked, players_unlocked = check_all_players_achievements(db, [ach])
+    print(f"Achievement {payload['achievement_id']} checked for {players_checked} player(s), unlocked by {players_unlocked}")
+
+
 def update_player_achievement(db: Session, user_id: int, metric: str, increment: int):
     # Find achievement requiring this metric
-    achievements = db.query(Achievement).filter(Achievement.metric == metric).all()
+    achievements = achievement_registry.for_metric(db, metric)
     achievement_unlocked = False
 
     for ach in achievements:
@@ -49,6 +76,7 @@ def update_player_achievement(db: Session, user_id: int, metric: str, increment:
         if not record.unlocked and record.current_value >= ach.target_value:
             record.unlocked = True
             record.unlocked_at = datetime.now(timezone.utc)
+            adjust_achievement_count(db, user_id, 1)
             achievement_unlocked = True
 
         db.commit()
@@ -56,3 +84,4 @@ def update_player_achievement(db: Session, user_id: int, metric: str, increment:
     # Update user XP and level if an achievement was unlocked
     if achievement_unlocked:
         update_user_xp_and_level(db, user_id)
+        leaderboard_cache.bump()
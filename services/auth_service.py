@@ -4,6 +4,7 @@ from datetime import datetime, timedelta, timezone
 import random
 
 from models.user import User
+from models.player_total import PlayerTotal
 from utils.hashing import Hash
 from utils.jwt_handler import create_access_token, verify_email_token, verify_reset_token
 from core.security import validate_password
@@ -53,6 +54,9 @@ def register_user(db, data, photo_url=None):
     verification_code = generate_verification_code()
     new_user.verification_code = verification_code
     new_user.verification_code_expires_at = datetime.now(timezone.utc) + timedelta(minutes=15)
+
+    # Every player gets an (empty) aggregates row so they show up on the leaderboards
+    db.add(PlayerTotal(player_id=new_user.id))
     db.commit()
     db.refresh(new_user)
     
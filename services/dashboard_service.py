@@ -1,15 +1,13 @@
 from sqlalchemy.orm import Session
 from models.user import User
 from models.trophy import Trophy
-from models.stat import Stat
+from services.player_totals_service import get_player_totals
 
 def get_dashboard_data(db: Session, user_id: int):
     user = db.query(User).filter(User.id == user_id).first()
 
-    total_goals = db.query(Stat).filter(Stat.player_id == user_id).with_entities(
-        Stat.goals
-    )
-    total_goals = sum([s for s in (g[0] for g in total_goals)])
+    totals = get_player_totals(db, user_id)
+    total_goals = totals.total_goals if totals else 0
 
     trophies = db.query(Trophy).filter(Trophy.awarded_to == user_id).count()
 
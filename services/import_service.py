@@ -0,0 +1,392 @@
+"""
+Streaming importer for historical matches and stats (CSV or NDJSON).
+
+Records are read one line at a time. A "match" record is followed by the
+"stat" records of its lineup; a stat can instead name an existing match with
+match_id. Rows are written with multi-row INSERTs and committed every
+`batch_size` records, so memory stays flat however large the file is.
+Derived data (trophies, match summaries, player totals, achievements and
+XP) is recomputed once at the end, for the matches and players the import
+touched only, so the rest of the league is never locked or rewritten.
+
+CSV columns (NDJSON lines use the same keys, "type" may be omitted there):
+    type, home_team, away_team, home_score, away_score, match_date,
+    match_id, player_id, username, team, goals, assists, rating, created_at
+"""
+import csv
+import json
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from models.match import Match
+from models.stat import Stat
+from models.user import User
+from models.trophy import Trophy
+from services.match_service import match_winner
+from services.trophy_service import rebuild_trophies
+from services.player_totals_service import refresh_player_totals
+from services.match_summary_service import refresh_match_summaries
+from services.achievement_checker import check_all_players_achievements
+from core.cache import leaderboard_cache, lineup_cache, match_cache
+
+DEFAULT_BATCH_SIZE = 1000
+# Matches / players per statement (and transaction) when recomputing derived data
+RECOMPUTE_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 20
+
+
+class ImportRecordError(ValueError):
+    """A record that cannot be imported (the line is skipped)"""
+
+
+class ImportAbortedError(Exception):
+    """
+    The import stopped midway (unreadable file, database error, ...).
+    Batches committed before the failure stay; `summary` describes them and
+    whether derived data was recomputed for them.
+    """
+
+    def __init__(self, message: str, summary: dict):
+        super().__init__(message)
+        self.summary = summary
+
+
+def detect_format(filename: str) -> str:
+    """"csv" or "ndjson" from a file name"""
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    raise ImportRecordError(f"Cannot tell the format of '{filename}' (use .csv or .ndjson)")
+
+
+def read_records(lines, fmt: str):
+    """
+    Yield (line_number, record, error) for each record of an iterable of text lines.
+    Exactly one of record / error is set.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            # Empty cells mean "not given"
+            yield reader.line_num, {k: v for k, v in record.items() if k and v not in (None, "")}, None
+    elif fmt == "ndjson":
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"invalid JSON ({e})"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, "expected a JSON object"
+                continue
+            yield line_number, record, None
+    else:
+        raise ImportRecordError(f"Unsupported format '{fmt}' (use csv or ndjson)")
+
+
+def _int(record: dict, key: str, default=None):
+    value = record.get(key, default)
+    if value is None:
+        raise ImportRecordError(f"'{key}' is required")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ImportRecordError(f"'{key}' must be an integer")
+
+
+def _float(record: dict, key: str, default: float):
+    try:
+        return float(record.get(key, default))
+    except (TypeError, ValueError):
+        raise ImportRecordError(f"'{key}' must be a number")
+
+
+def _datetime(record: dict, key: str, required: bool = False):
+    value = record.get(key)
+    if value is None:
+        if required:
+            raise ImportRecordError(f"'{key}' is required")
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        raise ImportRecordError(f"'{key}' must be an ISO date/time")
+
+
+def _record_type(record: dict) -> str:
+    record_type = record.get("type")
+    if record_type is None:
+        record_type = "match" if "home_team" in record else "stat"
+    if record_type not in ("match", "stat"):
+        raise ImportRecordError(f"unknown record type '{record_type}'")
+    return record_type
+
+
+def _parse_match(record: dict) -> dict:
+    home_team = record.get("home_team")
+    away_team = record.get("away_team")
+    if not home_team or not away_team:
+        raise ImportRecordError("'home_team' and 'away_team' are required")
+
+    home_score = _int(record, "home_score", 0)
+    away_score = _int(record, "away_score", 0)
+    match_date = _datetime(record, "match_date", required=True)
+
+    return {
+        "home_team": home_team,
+        "away_team": away_team,
+        "home_score": home_score,
+        "away_score": away_score,
+        "match_date": match_date,
+        "winner_team": match_winner(home_score, away_score),
+        "created_at": datetime.utcnow(),
+    }
+
+
+def _parse_stat(record: dict) -> dict:
+    team = record.get("team", "home")
+    if team not in ("home", "away"):
+        raise ImportRecordError("'team' must be 'home' or 'away'")
+    if record.get("player_id") is None and not record.get("username"):
+        raise ImportRecordError("'player_id' or 'username' is required")
+
+    return {
+        "player_id": _int(record, "player_id") if record.get("player_id") is not None else None,
+        "username": record.get("username"),
+        "team": team,
+        "goals": _int(record, "goals", 0),
+        "assists": _int(record, "assists", 0),
+        "rating": _float(record, "rating", 0.0),
+        "created_at": _datetime(record, "created_at"),
+    }
+
+
+class _Batch:
+    """Records waiting for the next multi-row INSERT"""
+
+    def __init__(self):
+        self.matches = []  # match rows, in file order
+        self.stats = []  # (line_number, stat row); row has "match_id" or "_match_index" into self.matches
+
+    def __len__(self):
+        return len(self.matches) + len(self.stats)
+
+
+class _Touched:
+    """Matches and players with committed imported rows (their derived data needs recomputing)"""
+
+    def __init__(self):
+        self.match_ids = set()
+        self.player_ids = set()
+
+    def __bool__(self):
+        return bool(self.match_ids or self.player_ids)
+
+
+def _flush(db: Session, batch: _Batch, summary: dict, touched: _Touched):
+    """
+    Insert a batch (matches first, then their stats) and commit.
+    Returns the ids of the inserted matches, in batch order.
+    """
+    match_ids = []
+    if batch.matches:
+        match_ids = db.execute(
+            insert(Match).returning(Match.id, sort_by_parameter_order=True),
+            batch.matches,
+        ).scalars().all()
+
+    # Resolve usernames, and check players and existing matches, once per batch
+    usernames = {row["username"] for _, row in batch.stats if row["player_id"] is None}
+    ids_by_username = dict(
+        db.query(User.username, User.id).filter(User.username.in_(usernames)).all()
+    ) if usernames else {}
+    player_ids = {row["player_id"] for _, row in batch.stats if row["player_id"] is not None}
+    known_players = {
+        row.id for row in db.query(User.id).filter(User.id.in_(player_ids)).all()
+    } if player_ids else set()
+    existing_match_ids = {row["match_id"] for _, row in batch.stats if "match_id" in row}
+    existing_match_dates = dict(
+        db.query(Match.id, Match.match_date).filter(Match.id.in_(existing_match_ids)).all()
+    ) if existing_match_ids else {}
+
+    stat_rows = []
+    for line_number, row in batch.stats:
+        try:
+            if "_match_index" in row:
+                match_index = row.pop("_match_index")
+                row["match_id"] = match_ids[match_index]
+                match_date = batch.matches[match_index]["match_date"]
+            else:
+                if row["match_id"] not in existing_match_dates:
+                    raise ImportRecordError(f"match {row['match_id']} does not exist")
+                match_date = existing_match_dates[row["match_id"]]
+
+            username = row.pop("username")
+            if row["player_id"] is None:
+                if username not in ids_by_username:
+                    raise ImportRecordError(f"unknown username '{username}'")
+                row["player_id"] = ids_by_username[username]
+            elif row["player_id"] not in known_players:
+                raise ImportRecordError(f"player {row['player_id']} does not exist")
+
+            # Historical stats are dated by their match unless the file says otherwise
+            if row["created_at"] is None:
+                row["created_at"] = match_date
+        except ImportRecordError as e:
+            _record_error(summary, line_number, str(e))
+            continue
+        stat_rows.append(row)
+
+    if stat_rows:
+        db.execute(insert(Stat), stat_rows)
+
+    db.commit()
+    lineup_cache.bump()
+    match_cache.bump()
+    touched.match_ids.update(match_ids)
+    touched.match_ids.update(row["match_id"] for row in stat_rows)
+    touched.player_ids.update(row["player_id"] for row in stat_rows)
+    summary["matches"] += len(match_ids)
+    summary["stats"] += len(stat_rows)
+    return match_ids
+
+
+def _record_error(summary: dict, line_number: int, message: str):
+    summary["skipped"] += 1
+    if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+        summary["errors"].append(f"line {line_number}: {message}")
+
+
+def _chunks(ids):
+    ids = sorted(ids)
+    for start in range(0, len(ids), RECOMPUTE_CHUNK_SIZE):
+        yield ids[start:start + RECOMPUTE_CHUNK_SIZE]
+
+
+def recompute_derived_data(db: Session, touched: _Touched) -> dict:
+    """
+    Trophies, match summaries, player totals, achievements and XP for the
+    matches and players an import touched. Every step locks and rewrites only
+    their rows (a chunk per transaction), so stats written meanwhile by the
+    live app keep their increments.
+    """
+    match_ids = sorted(touched.match_ids)
+    player_ids = set(touched.player_ids)
+
+    trophies = 0
+    for chunk in _chunks(match_ids):
+        # A trophy that moves changes its previous holder's count too
+        player_ids.update(
+            row.awarded_to for row in db.query(Trophy.awarded_to).filter(Trophy.match_id.in_(chunk)).all()
+        )
+        trophies += rebuild_trophies(db, chunk)
+        player_ids.update(
+            row.awarded_to for row in db.query(Trophy.awarded_to).filter(Trophy.match_id.in_(chunk)).all()
+        )
+
+    refresh_match_summaries(db, match_ids, RECOMPUTE_CHUNK_SIZE)
+    refresh_player_totals(db, player_ids, RECOMPUTE_CHUNK_SIZE)
+
+    players_checked = players_with_new = 0
+    for chunk in _chunks(touched.player_ids):
+        checked, with_new = check_all_players_achievements(db, player_ids=chunk)
+        players_checked += checked
+        players_with_new += with_new
+    leaderboard_cache.bump()
+    return {
+        "trophies_updated": trophies,
+        "players_checked": players_checked,
+        "players_with_new_achievements": players_with_new,
+    }
+
+
+def import_history(db: Session, lines, fmt: str, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """
+    Import matches and stats from an iterable of text lines (an open file works).
+    Bad records are skipped and reported; rows are committed every `batch_size` records.
+    Returns a summary of what was imported.
+    If the import stops midway, derived data is still recomputed for the
+    committed batches and ImportAbortedError is raised with the summary.
+    A failed recompute is reported as "recompute_error".
+    """
+    summary = {"matches": 0, "stats": 0, "skipped": 0, "errors": []}
+    touched = _Touched()
+    try:
+        _import_records(db, lines, fmt, batch_size, summary, touched)
+    except ImportRecordError:
+        # Unsupported format: raised before anything is read
+        raise
+    except Exception as e:
+        db.rollback()
+        summary["aborted"] = f"{type(e).__name__}: {e}"
+        raise ImportAbortedError(f"Import stopped: {e}", summary) from e
+    finally:
+        # Committed batches need their trophies, summaries, totals and achievements
+        if touched:
+            try:
+                summary.update(recompute_derived_data(db, touched))
+            except Exception as e:
+                db.rollback()
+                summary["recompute_error"] = f"{type(e).__name__}: {e}"
+
+    return summary
+
+
+def _import_records(db: Session, lines, fmt: str, batch_size: int, summary: dict, touched: _Touched):
+    """Parse, batch and insert every record, updating `summary` as batches are committed"""
+    batch = _Batch()
+    # Match that following stat records belong to: an id, or an index into the current batch
+    current_match_id = None
+    current_match_index = None
+    # The last match record was skipped: its stats must not fall through to the match before it
+    rejected_match = False
+
+    for line_number, record, error in read_records(lines, fmt):
+        if error:
+            _record_error(summary, line_number, error)
+            continue
+
+        record_type = None
+        try:
+            record_type = _record_type(record)
+            if record_type == "match":
+                batch.matches.append(_parse_match(record))
+                current_match_index = len(batch.matches) - 1
+                current_match_id = None
+                rejected_match = False
+            else:
+                row = _parse_stat(record)
+                if record.get("match_id") is not None:
+                    row["match_id"] = _int(record, "match_id")
+                elif rejected_match:
+                    raise ImportRecordError("stat belongs to a rejected match")
+                elif current_match_index is not None:
+                    row["_match_index"] = current_match_index
+                elif current_match_id is not None:
+                    row["match_id"] = current_match_id
+                else:
+                    raise ImportRecordError("stat has no match (put it after its match record or give match_id)")
+                batch.stats.append((line_number, row))
+        except ImportRecordError as e:
+            if record_type == "match":
+                current_match_id = None
+                current_match_index = None
+                rejected_match = True
+            _record_error(summary, line_number, str(e))
+            continue
+
+        if len(batch) >= batch_size:
+            match_ids = _flush(db, batch, summary, touched)
+            if current_match_index is not None:
+                current_match_id = match_ids[current_match_index]
+                current_match_index = None
+            batch = _Batch()
+
+    if len(batch):
+        _flush(db, batch, summary, touched)
@@ -0,0 +1,309 @@
+"""
+In-process background job queue backed by the durable `jobs` table.
+
+Write paths enqueue() jobs in the same transaction as the data they derive
+from and call job_queue.notify() after committing. A small pool of worker
+threads claims pending jobs oldest first, runs the handler registered for the
+job kind and deletes the job when it succeeds. Failed jobs are retried up to
+JOB_MAX_ATTEMPTS times, each retry waiting twice as long as the one before
+(JOB_RETRY_BACKOFF seconds first), and then kept with status "failed" and the
+last error.
+
+A running job belongs to the process that claimed it (the job's owner), which
+refreshes its heartbeat every JOB_HEARTBEAT_INTERVAL seconds. Workers of every
+process periodically re-queue running jobs whose heartbeat is older than
+JOB_STALE_AFTER, so jobs of a crashed process are picked up again while the
+app keeps running, and a long job of a live process is never run twice.
+"""
+import os
+import json
+import socket
+import threading
+import uuid
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_, and_
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database import SessionLocal
+from models.job import Job
+
+# kind -> handler(db, payload)
+_handlers = {}
+
+
+def job_handler(kind: str):
+    """Register the function that processes jobs of `kind`"""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(db: Session, kind: str, payload: dict) -> Job:
+    """Add a job to the session; it is durable once the caller commits"""
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload),
+        status="pending",
+        attempts=0,
+        created_at=datetime.utcnow(),
+    )
+    db.add(job)
+    return job
+
+
+def _due(now: datetime):
+    """Filter for jobs that may run now (not waiting out a retry backoff)"""
+    return or_(Job.run_after.is_(None), Job.run_after <= now)
+
+
+class JobQueue:
+    def __init__(self, workers: int = 2, poll_interval: float = 5.0, max_attempts: int = 3,
+                 stale_after: int = 60, retry_backoff: float = 30.0, heartbeat_interval: float = 15.0):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.stale_after = stale_after
+        self.retry_backoff = retry_backoff
+        self.heartbeat_interval = heartbeat_interval
+        # Unique per process, so a restarted process never passes for its predecessor
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._last_sweep = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        # Counters for this process since start
+        self._processed = 0
+        self._errors = 0
+        self._lag_total = 0.0
+        self._last_lag = 0.0
+
+    def start(self):
+        """Recover jobs orphaned by a crashed process and start the workers and the heartbeat"""
+        if self._threads:
+            return
+        self._requeue_stale()
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        print(f"⚙️ Job queue started with {self.workers} worker(s).")
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the workers after their current job (pending jobs stay in the table)"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """Wake the workers (call after committing newly enqueued jobs)"""
+        self._wake.set()
+
+    def _requeue_stale(self):
+        """Put running jobs whose owner stopped sending heartbeats back to pending"""
+        db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+            requeued = (
+                db.query(Job)
+                .filter(Job.status == "running", or_(
+                    Job.heartbeat_at < cutoff,
+                    # Claimed before heartbeats existed
+                    and_(Job.heartbeat_at.is_(None), Job.started_at < cutoff),
+                ))
+                .update({Job.status: "pending", Job.owner: None}, synchronize_session=False)
+            )
+            db.commit()
+            if requeued:
+                print(f"⚙️ Re-queued {requeued} interrupted job(s).")
+                self.notify()
+        finally:
+            db.close()
+
+    def _sweep_if_due(self):
+        """Run _requeue_stale at most once per heartbeat interval across this process's workers"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep < self.heartbeat_interval:
+                return
+            self._last_sweep = now
+        self._requeue_stale()
+
+    def _heartbeat(self):
+        """Mark this process's running jobs as alive until the queue stops"""
+        while not self._stop.wait(self.heartbeat_interval):
+            db = SessionLocal()
+            try:
+                (
+                    db.query(Job)
+                    .filter(Job.status == "running", Job.owner == self.owner)
+                    .update({Job.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+                )
+                db.commit()
+            except Exception as e:
+                print(f"⚠️ Job heartbeat error: {e}")
+            finally:
+                db.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Clear before looking for work so a notify() during run_next() is not lost
+            self._wake.clear()
+            try:
+                self._sweep_if_due()
+                ran = self.run_next()
+            except Exception as e:
+                print(f"⚠️ Job worker error: {e}")
+                ran = False
+            if not ran:
+                self._wake.wait(self.poll_interval)
+
+    def _retry_delay(self, attempts: int) -> timedelta:
+        """Backoff before retrying a job that has failed `attempts` times"""
+        return timedelta(seconds=self.retry_backoff * 2 ** (attempts - 1))
+
+    def _claim(self, db: Session):
+        """Mark the oldest runnable pending job as running; returns it, or None if there is none"""
+        while True:
+            job_id = (
+                db.query(Job.id)
+                .filter(Job.status == "pending", _due(datetime.utcnow()))
+                .order_by(Job.id)
+                .limit(1)
+                .scalar()
+            )
+            if job_id is None:
+                db.rollback()
+                return None
+            # Conditional update so two workers (or processes) never claim the same job
+            now = datetime.utcnow()
+            claimed = (
+                db.query(Job)
+                .filter(Job.id == job_id, Job.status == "pending")
+                .update(
+                    {
+                        Job.status: "running",
+                        Job.started_at: now,
+                        Job.heartbeat_at: now,
+                        Job.owner: self.owner,
+                        Job.attempts: Job.attempts + 1,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if claimed:
+                return db.query(Job).filter(Job.id == job_id).first()
+
+    def run_next(self) -> bool:
+        """Process one job; returns False when there was nothing to do"""
+        db = SessionLocal()
+        try:
+            job = self._claim(db)
+            if not job:
+                return False
+
+            job_id = job.id
+            lag = (job.started_at - job.created_at).total_seconds() if job.created_at else 0.0
+
+            try:
+                handler = _handlers.get(job.kind)
+                if handler is None:
+                    raise ValueError(f"No handler registered for job kind '{job.kind}'")
+                handler(db, json.loads(job.payload))
+            except Exception:
+                db.rollback()
+                error = traceback.format_exc()
+                print(f"⚠️ Job {job_id} ({job.kind}) failed: {error.strip().splitlines()[-1]}")
+                job = db.query(Job).filter(Job.id == job_id).first()
+                job.last_error = error[-2000:]
+                if job.attempts < self.max_attempts:
+                    # Back off so a failing job doesn't keep the workers busy
+                    job.status = "pending"
+                    job.run_after = datetime.utcnow() + self._retry_delay(job.attempts)
+                else:
+                    job.status = "failed"
+                db.commit()
+                with self._lock:
+                    self._errors += 1
+                return True
+
+            db.query(Job).filter(Job.id == job_id).delete(synchronize_session=False)
+            db.commit()
+            with self._lock:
+                self._processed += 1
+                self._lag_total += lag
+                self._last_lag = lag
+            return True
+        finally:
+            db.close()
+
+    def wait_until_idle(self, timeout: float = 30.0) -> bool:
+        """
+        Block until no job is running or due (e.g. before shutdown); False on timeout.
+        Jobs waiting out a retry backoff don't count, they stay in the table.
+        """
+        deadline = datetime.utcnow() + timedelta(seconds=timeout)
+        while True:
+            db = SessionLocal()
+            try:
+                busy = (
+                    db.query(Job.id)
+                    .filter(or_(Job.status == "running", (Job.status == "pending") & _due(datetime.utcnow())))
+                    .first()
+                )
+            finally:
+                db.close()
+            if not busy:
+                return True
+            if datetime.utcnow() >= deadline:
+                return False
+            self.notify()
+            self._stop.wait(0.05)
+
+    def metrics(self, db: Session) -> dict:
+        """Backlog (from the jobs table) and lag (enqueue -> start) metrics"""
+        counts = dict(db.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+        oldest_pending = db.query(func.min(Job.created_at)).filter(Job.status == "pending").scalar()
+        retrying = db.query(func.count(Job.id)).filter(Job.status == "pending", Job.run_after > datetime.utcnow()).scalar()
+        oldest_age = (datetime.utcnow() - oldest_pending).total_seconds() if oldest_pending else 0.0
+
+        with self._lock:
+            processed = self._processed
+            errors = self._errors
+            avg_lag = self._lag_total / processed if processed else 0.0
+            last_lag = self._last_lag
+
+        return {
+            "backlog": counts.get("pending", 0),
+            "retrying": retrying,
+            "running": counts.get("running", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_pending_age_seconds": round(oldest_age, 3),
+            "workers": sum(1 for t in self._threads if t.name.startswith("job-worker") and t.is_alive()),
+            "processed": processed,
+            "errors": errors,
+            "avg_lag_seconds": round(avg_lag, 3),
+            "last_lag_seconds": round(last_lag, 3),
+        }
+
+
+job_queue = JobQueue(
+    workers=settings.JOB_WORKERS,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+    stale_after=settings.JOB_STALE_AFTER,
+    retry_backoff=settings.JOB_RETRY_BACKOFF,
+    heartbeat_interval=settings.JOB_HEARTBEAT_INTERVAL,
+)
@@ -1,44 +1,22 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, and_, or_
 from models.user import User
-from models.stat import Stat
-from models.trophy import Trophy
-from models.achievement import PlayerAchievement
-from services.xp_service import update_user_xp_and_level
+from models.player_total import PlayerTotal
+from services.stathub_ranking_service import ranking_entry, ranking_sort_key
 
 
-def get_leaderboard(db: Session, limit: int = 50):
-    """
-    Get StatHub ranking leaderboard ranked by average StatHub rating.
-    Includes ALL players, even those with 0 rating or no matches.
-    Excludes admin users.
-    """
-    # Get aggregated stats for each user
-    stats_subquery = (
-        db.query(
-            Stat.player_id,
-            func.sum(Stat.goals).label("total_goals"),
-            func.sum(Stat.assists).label("total_assists"),
-            func.avg(Stat.rating).label("avg_rating"),
-            func.count(Stat.id).label("matches_played")
-        )
-        .group_by(Stat.player_id)
-        .subquery()
-    )
-
-    # Get trophy counts
-    trophy_subquery = (
-        db.query(
-            Trophy.awarded_to,
-            func.count(Trophy.id).label("trophy_count")
-        )
-        .group_by(Trophy.awarded_to)
-        .subquery()
-    )
-
-    # Start from User table to ensure ALL players are included
-    # Use func.coalesce to ensure XP and level default to 0 and 1 if None
-    results = (
+# ------------------------------------------------------
+# Board queries
+# Every board ranks on columns stored in player_totals (one row per user),
+# so the database sorts and limits the full leaderboard, and a single
+# user's rank is 1 + the number of players strictly ahead of them.
+# Ranking keys are (column, descending, row attribute) and match the column
+# order and directions of the board's ix_player_totals_*_rank index, so
+# boards, rank counts and neighbour lookups are walks of that index.
+# ------------------------------------------------------
+def _stathub_query(db: Session):
+    """Base query for the StatHub board (average rating, then user_id)"""
+    return (
         db.query(
             User.id,
             User.username,
@@ -48,90 +26,54 @@ def get_leaderboard(db: Session, limit: int = 50):
             User.favorite_position,
             func.coalesce(User.xp, 0).label("xp"),
             func.coalesce(User.level, 1).label("level"),
-            func.coalesce(stats_subquery.c.total_goals, 0).label("total_goals"),
-            func.coalesce(stats_subquery.c.total_assists, 0).label("total_assists"),
-            func.coalesce(stats_subquery.c.avg_rating, 0).label("avg_rating"),
-            func.coalesce(stats_subquery.c.matches_played, 0).label("matches_played"),
-            func.coalesce(trophy_subquery.c.trophy_count, 0).label("trophy_count"),
+            PlayerTotal.total_goals,
+            PlayerTotal.total_assists,
+            PlayerTotal.avg_rating,
+            PlayerTotal.matches_played,
+            PlayerTotal.trophy_count,
         )
-        .filter(User.role == "player")  # Exclude admin - do this first
-        .outerjoin(stats_subquery, User.id == stats_subquery.c.player_id)
-        .outerjoin(trophy_subquery, User.id == trophy_subquery.c.awarded_to)
-        .all()
+        .join(PlayerTotal, User.id == PlayerTotal.player_id)
+        .filter(User.role == "player")  # Exclude admin
     )
 
-    # Build leaderboard with average rating
-    leaderboard = []
-    for r in results:
-        # Get XP and level for display purposes (but not for ranking)
-        xp_info = update_user_xp_and_level(db, r.id)
-        current_xp = xp_info["xp"] if xp_info else (r.xp if r.xp is not None else 0)
-        current_level = xp_info["level"] if xp_info else (r.level if r.level is not None else 1)
-        
-        # Average rating is the primary ranking metric
-        avg_rating_value = round(float(r.avg_rating) if r.avg_rating else 0, 1)
-        
-        leaderboard.append({
-            "user_id": r.id,
-            "username": r.username,
-            "full_name": r.full_name,
-            "photo_url": r.photo_url,
-            "nationality": r.nationality,
-            "position": r.favorite_position,
-            "total_goals": int(r.total_goals) if r.total_goals else 0,
-            "total_assists": int(r.total_assists) if r.total_assists else 0,
-            "avg_rating": avg_rating_value,
-            "matches_played": int(r.matches_played) if r.matches_played else 0,
-            "trophy_count": int(r.trophy_count) if r.trophy_count else 0,
-            "xp": int(current_xp),
-            "level": int(current_level),
-            "points": avg_rating_value,  # Use avg_rating as "points" for ranking display
-        })
-
-    # Sort by average rating descending and add rank to ALL players
+
+def _stathub_keys():
+    # Sort by average rating descending, user_id keeps ties stable
     # This ensures players with 0 rating still appear at the bottom
-    leaderboard.sort(key=lambda x: x["avg_rating"], reverse=True)
-    
-    # Rank ALL players first (not just the limited set)
-    for i, player in enumerate(leaderboard, 1):
-        player["rank"] = i
+    return ((PlayerTotal.avg_rating, True, "avg_rating"), (PlayerTotal.player_id, False, "id"))
 
-    # Return the limited set (but all players have been ranked)
-    return leaderboard[:limit]
 
+def _stathub_sort_key(r):
+    """Python equivalent of _stathub_keys for rows that are already loaded"""
+    return (-r.avg_rating, r.id)
 
-def get_achievements_leaderboard(db: Session, limit: int = 50):
-    """
-    Get achievements leaderboard ranked by number of unlocked achievements.
-    Includes ALL players, even those with 0 achievements.
-    Excludes admin users.
-    """
-    # Get achievement counts for each user (only unlocked ones)
-    achievement_subquery = (
-        db.query(
-            PlayerAchievement.user_id,
-            func.count(PlayerAchievement.id).label("achievement_count")
-        )
-        .filter(PlayerAchievement.unlocked == True)
-        .group_by(PlayerAchievement.user_id)
-        .subquery()
-    )
 
-    # Get aggregated stats
-    stats_subquery = (
-        db.query(
-            Stat.player_id,
-            func.sum(Stat.goals).label("total_goals"),
-            func.sum(Stat.assists).label("total_assists"),
-            func.avg(Stat.rating).label("avg_rating"),
-            func.count(Stat.id).label("matches_played")
-        )
-        .group_by(Stat.player_id)
-        .subquery()
-    )
+def _stathub_entry(r, rank: int) -> dict:
+    # Average rating is the primary ranking metric
+    avg_rating_value = round(float(r.avg_rating) if r.avg_rating else 0, 1)
 
-    # Start from User table to ensure ALL players are included
-    results = (
+    return {
+        "user_id": r.id,
+        "username": r.username,
+        "full_name": r.full_name,
+        "photo_url": r.photo_url,
+        "nationality": r.nationality,
+        "position": r.favorite_position,
+        "total_goals": int(r.total_goals) if r.total_goals else 0,
+        "total_assists": int(r.total_assists) if r.total_assists else 0,
+        "avg_rating": avg_rating_value,
+        "matches_played": int(r.matches_played) if r.matches_played else 0,
+        "trophy_count": int(r.trophy_count) if r.trophy_count else 0,
+        "xp": int(r.xp),
+        "level": int(r.level),
+        "points": avg_rating_value,  # Use avg_rating as "points" for ranking display
+        "rank": rank,
+    }
+
+
+def _achievements_query(db: Session):
+    """Base query for the achievements board (unlocked count, then XP, then user_id)"""
+    return (
         db.query(
             User.id,
             User.username,
@@ -139,77 +81,126 @@ def get_achievements_leaderboard(db: Session, limit: int = 50):
             User.photo_url,
             User.nationality,
             User.favorite_position,
-            User.xp,
-            User.level,
-            func.coalesce(achievement_subquery.c.achievement_count, 0).label("achievement_count"),
-            func.coalesce(stats_subquery.c.total_goals, 0).label("total_goals"),
-            func.coalesce(stats_subquery.c.total_assists, 0).label("total_assists"),
-            func.coalesce(stats_subquery.c.avg_rating, 0).label("avg_rating"),
-            func.coalesce(stats_subquery.c.matches_played, 0).label("matches_played"),
+            func.coalesce(User.xp, 0).label("xp"),
+            func.coalesce(User.level, 1).label("level"),
+            PlayerTotal.achievement_count,
+            PlayerTotal.xp.label("rank_xp"),
+            PlayerTotal.total_goals,
+            PlayerTotal.total_assists,
+            PlayerTotal.avg_rating,
+            PlayerTotal.matches_played,
         )
-        .filter(User.role == "player")  # Exclude admin - do this first
-        .outerjoin(achievement_subquery, User.id == achievement_subquery.c.user_id)
-        .outerjoin(stats_subquery, User.id == stats_subquery.c.player_id)
-        .all()
+        .join(PlayerTotal, User.id == PlayerTotal.player_id)
+        .filter(User.role == "player")  # Exclude admin
     )
 
-    leaderboard = []
-    for r in results:
-        leaderboard.append({
-            "user_id": r.id,
-            "username": r.username,
-            "full_name": r.full_name,
-            "photo_url": r.photo_url,
-            "nationality": r.nationality,
-            "position": r.favorite_position,
-            "achievement_count": r.achievement_count or 0,
-            "total_goals": r.total_goals or 0,
-            "total_assists": r.total_assists or 0,
-            "avg_rating": round(r.avg_rating or 0, 1),
-            "matches_played": r.matches_played or 0,
-            "xp": r.xp or 0,
-            "level": r.level or 1,
-        })
 
+def _achievements_keys():
     # Sort by achievement count descending, then by XP as tiebreaker
+    # (player_totals.xp, the copy of users.xp, so the rank index covers it)
     # This ensures players with 0 achievements still appear
-    leaderboard.sort(key=lambda x: (x["achievement_count"], x["xp"]), reverse=True)
-    for i, player in enumerate(leaderboard[:limit], 1):
-        player["rank"] = i
+    return (
+        (PlayerTotal.achievement_count, True, "achievement_count"),
+        (PlayerTotal.xp, True, "rank_xp"),
+        (PlayerTotal.player_id, False, "id"),
+    )
 
-    return leaderboard[:limit]
 
+def _achievements_sort_key(r):
+    """Python equivalent of _achievements_keys for rows that are already loaded"""
+    return (-r.achievement_count, -r.rank_xp, r.id)
+
+
+def _achievements_entry(r, rank: int) -> dict:
+    return {
+        "user_id": r.id,
+        "username": r.username,
+        "full_name": r.full_name,
+        "photo_url": r.photo_url,
+        "nationality": r.nationality,
+        "position": r.favorite_position,
+        "achievement_count": r.achievement_count or 0,
+        "total_goals": r.total_goals or 0,
+        "total_assists": r.total_assists or 0,
+        "avg_rating": round(r.avg_rating or 0, 1),
+        "matches_played": r.matches_played or 0,
+        "xp": r.xp or 0,
+        "level": r.level or 1,
+        "rank": rank,
+    }
 
-def get_trophies_leaderboard(db: Session, limit: int = 1000):
-    """
-    Get trophies leaderboard ranked by number of trophies.
-    Includes ALL players (non-admin), even those with 0 trophies.
-    """
-    # Get trophy counts
-    trophy_subquery = (
-        db.query(
-            Trophy.awarded_to,
-            func.count(Trophy.id).label("trophy_count")
-        )
-        .group_by(Trophy.awarded_to)
-        .subquery()
-    )
 
-    # Get aggregated stats
-    stats_subquery = (
+def _trophies_query(db: Session):
+    """Base query for the trophies board (trophy count, then user_id)"""
+    return (
         db.query(
-            Stat.player_id,
-            func.sum(Stat.goals).label("total_goals"),
-            func.sum(Stat.assists).label("total_assists"),
-            func.avg(Stat.rating).label("avg_rating"),
-            func.count(Stat.id).label("matches_played")
+            User.id,
+            User.username,
+            User.full_name,
+            User.photo_url,
+            User.nationality,
+            User.favorite_position,
+            func.coalesce(User.xp, 0).label("xp"),
+            func.coalesce(User.level, 1).label("level"),
+            PlayerTotal.trophy_count,
+            PlayerTotal.total_goals,
+            PlayerTotal.total_assists,
+            PlayerTotal.avg_rating,
+            PlayerTotal.matches_played,
         )
-        .group_by(Stat.player_id)
-        .subquery()
+        .join(PlayerTotal, User.id == PlayerTotal.player_id)
+        .filter(User.role == "player")  # Exclude admin
     )
 
-    # Start from User table to ensure ALL players are included
-    results = (
+
+def _trophies_keys():
+    # Sort by trophy count descending, then by user_id for consistent ranking
+    # This ensures players with 0 trophies still appear at the bottom
+    return ((PlayerTotal.trophy_count, True, "trophy_count"), (PlayerTotal.player_id, False, "id"))
+
+
+def _trophies_sort_key(r):
+    """Python equivalent of _trophies_keys for rows that are already loaded"""
+    return (-r.trophy_count, r.id)
+
+
+def _trophies_entry(r, rank: int) -> dict:
+    return {
+        "user_id": r.id,
+        "username": r.username,
+        "full_name": r.full_name,
+        "photo_url": r.photo_url,
+        "nationality": r.nationality,
+        "position": r.favorite_position,
+        "trophy_count": int(r.trophy_count) if r.trophy_count else 0,
+        "total_goals": int(r.total_goals) if r.total_goals else 0,
+        "total_assists": int(r.total_assists) if r.total_assists else 0,
+        "avg_rating": round(float(r.avg_rating) if r.avg_rating else 0, 1),
+        "matches_played": int(r.matches_played) if r.matches_played else 0,
+        "xp": int(r.xp) if r.xp else 0,
+        "level": int(r.level) if r.level else 1,
+        "rank": rank,
+    }
+
+
+# (base query, ranking keys, row -> entry) per board
+BOARDS = {
+    "stathub": (_stathub_query, _stathub_keys, _stathub_entry),
+    "achievements": (_achievements_query, _achievements_keys, _achievements_entry),
+    "trophies": (_trophies_query, _trophies_keys, _trophies_entry),
+}
+
+# In-memory sort keys matching each board's ranking keys
+BOARD_SORT_KEYS = {
+    "stathub": _stathub_sort_key,
+    "achievements": _achievements_sort_key,
+    "trophies": _trophies_sort_key,
+}
+
+
+def _players_query(db: Session):
+    """Every column any board needs, for all players, in one pass over users + player_totals"""
+    return (
         db.query(
             User.id,
             User.username,
@@ -217,72 +208,178 @@ def get_trophies_leaderboard(db: Session, limit: int = 1000):
             User.photo_url,
             User.nationality,
             User.favorite_position,
-            User.xp,
-            User.level,
-            func.coalesce(trophy_subquery.c.trophy_count, 0).label("trophy_count"),
-            func.coalesce(stats_subquery.c.total_goals, 0).label("total_goals"),
-            func.coalesce(stats_subquery.c.total_assists, 0).label("total_assists"),
-            func.coalesce(stats_subquery.c.avg_rating, 0).label("avg_rating"),
-            func.coalesce(stats_subquery.c.matches_played, 0).label("matches_played"),
+            func.coalesce(User.xp, 0).label("xp"),
+            func.coalesce(User.level, 1).label("level"),
+            PlayerTotal.total_goals,
+            PlayerTotal.total_assists,
+            PlayerTotal.avg_rating,
+            PlayerTotal.matches_played,
+            PlayerTotal.trophy_count,
+            PlayerTotal.achievement_count,
+            PlayerTotal.xp.label("rank_xp"),
         )
-        .filter(User.role == "player")  # Exclude admin - do this first
-        .outerjoin(trophy_subquery, User.id == trophy_subquery.c.awarded_to)
-        .outerjoin(stats_subquery, User.id == stats_subquery.c.player_id)
-        .all()
+        .join(PlayerTotal, User.id == PlayerTotal.player_id)
+        .filter(User.role == "player")  # Exclude admin
     )
 
-    leaderboard = []
-    for r in results:
-        leaderboard.append({
-            "user_id": r.id,
-            "username": r.username,
-            "full_name": r.full_name,
-            "photo_url": r.photo_url,
-            "nationality": r.nationality,
-            "position": r.favorite_position,
-            "trophy_count": int(r.trophy_count) if r.trophy_count else 0,
-            "total_goals": int(r.total_goals) if r.total_goals else 0,
-            "total_assists": int(r.total_assists) if r.total_assists else 0,
-            "avg_rating": round(float(r.avg_rating) if r.avg_rating else 0, 1),
-            "matches_played": int(r.matches_played) if r.matches_played else 0,
-            "xp": int(r.xp) if r.xp else 0,
-            "level": int(r.level) if r.level else 1,
-        })
 
-    # Sort by trophy count descending, then by user_id for consistent ranking
-    # This ensures players with 0 trophies still appear at the bottom
-    leaderboard.sort(key=lambda x: (-x["trophy_count"], x["user_id"]))
-    
-    # Rank ALL players first (not just the limited set)
-    for i, player in enumerate(leaderboard, 1):
-        player["rank"] = i
+def _ordering(keys, reverse: bool = False):
+    """ORDER BY clauses for a board's ranking keys (reverse walks the board upwards)"""
+    return [
+        column.desc() if descending != reverse else column.asc()
+        for column, descending, _ in keys
+    ]
+
+
+def _neighbour_ranges(keys, r, ahead: bool):
+    """
+    Players ranked strictly ahead of (or behind) row r, as disjoint conditions
+    that are each a single range of the board's rank index: equal on the
+    leading keys, better (or worse) on the next one. Closest to r first.
+    """
+    ranges = []
+    for i in reversed(range(len(keys))):
+        column, descending, attr = keys[i]
+        value = getattr(r, attr)
+        closer_to_top = column > value if descending else column < value
+        closer_to_bottom = column < value if descending else column > value
+        ties = [c == getattr(r, a) for c, _, a in keys[:i]]
+        ranges.append(and_(*ties, closer_to_top if ahead else closer_to_bottom))
+    return ranges
+
+
+def _count_ahead(db: Session, keys, r) -> int:
+    """Count players (non-admin) ranked strictly ahead of row r on a board"""
+    return (
+        db.query(func.count(User.id))
+        .join(PlayerTotal, User.id == PlayerTotal.player_id)
+        .filter(User.role == "player", or_(*_neighbour_ranges(keys, r, ahead=True)))
+        .scalar()
+    ) or 0
+
+
+def _nearest(db: Session, query, keys, r, ahead: bool, limit: int):
+    """
+    The `limit` players closest to row r above it (ahead=True, nearest first)
+    or below it. One index seek per range, stopping once enough rows are found.
+    """
+    rows = []
+    for condition in _neighbour_ranges(keys, r, ahead):
+        if len(rows) >= limit:
+            break
+        rows += (
+            query(db)
+            .filter(condition)
+            .order_by(*_ordering(keys, reverse=ahead))
+            .limit(limit - len(rows))
+            .all()
+        )
+    return rows
+
+
+def _get_board(db: Session, board: str, limit: int):
+    query, keys, entry = BOARDS[board]
+
+    # Rows arrive in ranking order, so the position is the rank
+    results = query(db).order_by(*_ordering(keys())).limit(limit).all()
+    return [entry(r, i) for i, r in enumerate(results, 1)]
+
+
+def _get_user_board_rank(db: Session, board: str, user_id: int):
+    query, keys, entry = BOARDS[board]
+
+    r = query(db).filter(User.id == user_id).first()
+    if not r:
+        return None
+    return entry(r, _count_ahead(db, keys(), r) + 1)
+
+
+def get_leaderboard(db: Session, limit: int = 50):
+    """
+    Get StatHub ranking leaderboard ranked by average StatHub rating.
+    Includes ALL players, even those with 0 rating or no matches.
+    Excludes admin users.
+    XP and level are read as stored - they are kept fresh whenever achievements
+    unlock, so this is a single read-only statement.
+    """
+    return _get_board(db, "stathub", limit)
+
 
-    # Return the limited set (but all players have been ranked)
-    return leaderboard[:limit]
+def get_achievements_leaderboard(db: Session, limit: int = 50):
+    """
+    Get achievements leaderboard ranked by number of unlocked achievements.
+    Includes ALL players, even those with 0 achievements.
+    Excludes admin users.
+    """
+    return _get_board(db, "achievements", limit)
+
+
+def get_trophies_leaderboard(db: Session, limit: int = 1000):
+    """
+    Get trophies leaderboard ranked by number of trophies.
+    Includes ALL players (non-admin), even those with 0 trophies.
+    """
+    return _get_board(db, "trophies", limit)
 
 
 def get_user_rank(db: Session, user_id: int):
     """Get a specific user's rank on the StatHub ranking leaderboard"""
-    leaderboard = get_leaderboard(db, limit=1000)
-    for player in leaderboard:
-        if player["user_id"] == user_id:
-            return player
-    return None
+    return _get_user_board_rank(db, "stathub", user_id)
 
 
 def get_user_achievement_rank(db: Session, user_id: int):
     """Get a specific user's rank on the achievements leaderboard"""
-    leaderboard = get_achievements_leaderboard(db, limit=1000)
-    for player in leaderboard:
-        if player["user_id"] == user_id:
-            return player
-    return None
+    return _get_user_board_rank(db, "achievements", user_id)
 
 
 def get_user_trophy_rank(db: Session, user_id: int):
     """Get a specific user's rank on the trophies leaderboard"""
-    leaderboard = get_trophies_leaderboard(db, limit=1000)
-    for player in leaderboard:
-        if player["user_id"] == user_id:
-            return player
-    return None
+    return _get_user_board_rank(db, "trophies", user_id)
+
+
+def get_leaderboard_around_user(db: Session, user_id: int, board: str = "stathub", radius: int = 2):
+    """
+    Get the `radius` players ranked directly above and below a user on a board
+    ("stathub", "achievements" or "trophies"), including the user, in ranking order.
+    Both sides are seeks into the board's rank index starting at the user's own
+    ranking keys, so the cost doesn't depend on how far down the board the user is.
+    """
+    query, keys, entry = BOARDS[board]
+
+    me = query(db).filter(User.id == user_id).first()
+    if not me:
+        return None
+
+    my_rank = _count_ahead(db, keys(), me) + 1
+
+    # Closest players ahead (walking the board upwards) and behind
+    above = _nearest(db, query, keys(), me, ahead=True, limit=radius)
+    below = _nearest(db, query, keys(), me, ahead=False, limit=radius)
+
+    window = [entry(r, my_rank - i) for i, r in enumerate(above, 1)]
+    window.reverse()
+    window.append(entry(me, my_rank))
+    window.extend(entry(r, my_rank + i) for i, r in enumerate(below, 1))
+
+    return window
+
+
+def get_all_leaderboards(db: Session, boards, limit: int = 1000, sort_by: str = "rating", ranking_limit: int = 50):
+    """
+    Compute several leaderboards from a single scan of the per-player aggregates.
+    boards: any of "stathub", "achievements", "trophies", "stathub-ranking".
+    Each board is ranked exactly like its own endpoint.
+    """
+    players = _players_query(db).all()
+
+    result = {}
+    for board in boards:
+        if board == "stathub-ranking":
+            ranked = sorted(players, key=ranking_sort_key(sort_by))[:ranking_limit]
+            result[board] = [ranking_entry(r, i) for i, r in enumerate(ranked, 1)]
+        else:
+            entry = BOARDS[board][2]
+            ranked = sorted(players, key=BOARD_SORT_KEYS[board])[:limit]
+            result[board] = [entry(r, i) for i, r in enumerate(ranked, 1)]
+
+    return result
@@ -0,0 +1,179 @@
+"""
+Everything a match page shows, assembled in one request:
+match, lineup, per-team average ratings, trophy holder, a page of comments
+and reaction counts.
+
+At most four queries: match + trophy holder, lineup, comments, reactions.
+The match and trophy holder of a completed match are served from match_cache
+and the lineup from lineup_cache (the one GET /stats/match/{id}/players uses),
+both invalidated whenever stats, trophies or player profiles are written, so a
+cached page costs two queries. Comments and reactions are always read live.
+"""
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, tuple_
+
+from models.match import Match
+from models.trophy import Trophy
+from models.user import User
+from models.comment import Comment
+from models.reaction import Reaction
+from services.stat_service import get_match_players_detailed
+from utils.pagination import encode_cursor, decode_cursor
+from core.cache import match_cache, lineup_cache
+
+# Cached in place of upcoming (or missing) matches, which are always read live
+_NOT_COMPLETED = {"completed": False}
+
+
+def match_is_completed(match: Match) -> bool:
+    """A match is completed once its kick-off date has passed"""
+    return match.match_date <= datetime.utcnow()
+
+
+def _team_average(players):
+    ratings = [p["rating"] for p in players if p["rating"] is not None]
+    return round(sum(ratings) / len(ratings), 1) if ratings else None
+
+
+def _match_header(db: Session, match_id: int):
+    """Match and trophy holder (one query); None if the match does not exist"""
+    row = (
+        db.query(
+            Match,
+            Trophy.awarded_to,
+            Trophy.date_awarded,
+            User.username,
+            User.full_name,
+            User.photo_url,
+        )
+        .outerjoin(Trophy, Trophy.match_id == Match.id)
+        .outerjoin(User, User.id == Trophy.awarded_to)
+        .filter(Match.id == match_id)
+        .first()
+    )
+    if not row:
+        return None
+
+    match = row.Match
+    trophy = None
+    if row.awarded_to is not None:
+        trophy = {
+            "player_id": row.awarded_to,
+            "username": row.username,
+            "full_name": row.full_name,
+            "photo_url": row.photo_url,
+            "date_awarded": row.date_awarded,
+        }
+
+    return {
+        "match": {
+            "id": match.id,
+            "home_team": match.home_team,
+            "away_team": match.away_team,
+            "home_score": match.home_score,
+            "away_score": match.away_score,
+            "match_date": match.match_date,
+            "winner_team": match.winner_team,
+        },
+        "completed": match_is_completed(match),
+        "trophy": trophy,
+    }
+
+
+def _cached_match_header(db: Session, match_id: int):
+    """
+    _match_header through match_cache. Upcoming matches still change (lineups,
+    scores), so only completed ones are stored; for the rest the cache holds a
+    marker and the header is read live.
+    """
+    computed = []
+
+    def compute():
+        header = _match_header(db, match_id)
+        computed.append(header)
+        return header if header and header["completed"] else _NOT_COMPLETED
+
+    _, header = match_cache.get_or_compute(("match", match_id), compute)
+    if header is not _NOT_COMPLETED:
+        return header
+    # Reuse the row this request just read; requests served from the marker read it now
+    return computed[0] if computed else _match_header(db, match_id)
+
+
+def get_match_comments_page(db: Session, match_id: int, limit: int = 20, cursor: str = None):
+    """
+    One page of a match's comments in posting order, with author names.
+    Keyset pagination on (created_at, id). Returns (comments, next_cursor).
+    """
+    query = (
+        db.query(Comment, User.username, User.photo_url)
+        .outerjoin(User, User.id == Comment.author_id)
+        .filter(Comment.match_id == match_id)
+    )
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Comment.created_at, Comment.id) > tuple_(after_date, after_id))
+
+    # One extra row tells whether there is a next page
+    rows = query.order_by(Comment.created_at, Comment.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1].Comment
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    comments = [
+        {
+            "id": comment.id,
+            "content": comment.content,
+            "author_id": comment.author_id,
+            "author_username": username,
+            "author_photo_url": photo_url,
+            "created_at": comment.created_at,
+        }
+        for comment, username, photo_url in rows
+    ]
+    return comments, next_cursor
+
+
+def get_match_reaction_counts(db: Session, match_id: int) -> dict:
+    """Reaction counts for a match grouped by type"""
+    counts = (
+        db.query(Reaction.type, func.count(Reaction.id).label("count"))
+        .filter(Reaction.match_id == match_id)
+        .group_by(Reaction.type)
+        .all()
+    )
+    return {count.type: count.count for count in counts}
+
+
+def get_match_full(db: Session, match_id: int, comment_limit: int = 20, comment_cursor: str = None):
+    """
+    The whole match page, or None if the match does not exist.
+    Raises ValueError for a malformed comment cursor.
+    """
+    header = _cached_match_header(db, match_id)
+    if header is None:
+        return None
+
+    _, lineup = lineup_cache.get_or_compute(
+        ("lineup", match_id),
+        lambda: get_match_players_detailed(db, match_id)
+    )
+    comments, next_cursor = get_match_comments_page(db, match_id, comment_limit, comment_cursor)
+
+    # New dict: the cached header and lineup are shared between requests
+    return {
+        "match": header["match"],
+        "completed": header["completed"],
+        "lineup": lineup,
+        "home_avg_rating": _team_average(lineup["home_players"]),
+        "away_avg_rating": _team_average(lineup["away_players"]),
+        "trophy": header["trophy"],
+        "reactions": get_match_reaction_counts(db, match_id),
+        "comments": comments,
+        "comments_next_cursor": next_cursor,
+    }
@@ -1,15 +1,24 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import tuple_, select, func
 from models.match import Match
+from models.match_summary import MatchSummary
+from models.stat import Stat
+from utils.pagination import encode_cursor, decode_cursor
+
+def match_winner(home_score: int, away_score: int):
+    """Auto-determine winner based on scores ("home", "away", "draw", or None for 0-0)"""
+    if home_score > away_score:
+        return "home"
+    elif away_score > home_score:
+        return "away"
+    elif home_score == away_score and home_score > 0:
+        return "draw"
+    return None
+
 
 def create_match(db: Session, data):
     # Auto-determine winner based on scores
-    winner = None
-    if data.home_score > data.away_score:
-        winner = "home"
-    elif data.away_score > data.home_score:
-        winner = "away"
-    elif data.home_score == data.away_score and data.home_score > 0:
-        winner = "draw"
+    winner = match_winner(data.home_score, data.away_score)
 
     match = Match(
         home_team=data.home_team,
@@ -31,3 +40,75 @@ def list_matches(db: Session):
 
 def get_match(db: Session, match_id: int):
     return db.query(Match).filter(Match.id == match_id).first()
+
+
+def list_matches_page(db: Session, limit: int = 50, cursor: str = None):
+    """
+    One page of matches, newest first, with their precomputed summary
+    (team average ratings, MVP, player count, total goals).
+    Keyset pagination on (match_date, id): pass the returned next_cursor to get
+    the following page. A single range scan of ix_matches_date_id joined to
+    match_summaries by primary key. limit=None returns every match (unpaged).
+    Returns (rows of (Match, MatchSummary or None), next_cursor); next_cursor is None on the last page.
+    """
+    query = db.query(Match, MatchSummary).outerjoin(MatchSummary, MatchSummary.match_id == Match.id)
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Match.match_date, Match.id) < tuple_(after_date, after_id))
+
+    query = query.order_by(Match.match_date.desc(), Match.id.desc())
+    if limit is None:
+        return query.all(), None
+
+    # One extra row tells whether there is a next page
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1].Match
+        next_cursor = encode_cursor(last.match_date, last.id)
+
+    return rows, next_cursor
+
+
+def list_user_matches_page(db: Session, user_id: int, limit: int = 50, cursor: str = None):
+    """
+    One page of the matches a user played (newest first) with their stat line,
+    from a single Stat JOIN Match query. Each match appears once: when the
+    player has more than one stat row in a match, the first one (lowest id) is
+    used, as the history always did. Keyset pagination on (match_date, id):
+    pass the returned next_cursor to get the following page.
+    limit=None returns the whole history (unpaged).
+    Returns (rows of (Match, goals, assists, rating), next_cursor).
+    """
+    player_stat = aliased(Stat)
+    first_stat_ids = (
+        select(func.min(player_stat.id))
+        .where(player_stat.player_id == user_id)
+        .group_by(player_stat.match_id)
+    )
+    query = (
+        db.query(Match, Stat.goals, Stat.assists, Stat.rating)
+        .join(Stat, Stat.match_id == Match.id)
+        .filter(Stat.id.in_(first_stat_ids))
+    )
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Match.match_date, Match.id) < tuple_(after_date, after_id))
+
+    query = query.order_by(Match.match_date.desc(), Match.id.desc())
+    if limit is None:
+        return query.all(), None
+
+    # One extra row tells whether there is a next page
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1].Match
+        next_cursor = encode_cursor(last.match_date, last.id)
+
+    return rows, next_cursor
+
@@ -0,0 +1,189 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case
+from models.match_summary import MatchSummary
+from models.match import Match
+from models.stat import Stat
+from models.trophy import Trophy
+from utils.upsert import dialect_insert
+
+
+def _average(rating_sum: float, player_count: int):
+    """Team average rating rounded the way the match list displays it (None without players)"""
+    if not player_count:
+        return None
+    return round(rating_sum / player_count, 1)
+
+
+def _lock_summary(db: Session, match_id: int):
+    return (
+        db.query(MatchSummary)
+        .filter(MatchSummary.match_id == match_id)
+        .with_for_update()
+        .first()
+    )
+
+
+def _get_summary_for_update(db: Session, match_id: int):
+    """
+    Lock the match's summary row, creating an empty one if it doesn't exist yet.
+    The row is created with ON CONFLICT DO NOTHING, so concurrent first stats
+    of a match both end up locking the same row instead of both inserting it.
+    """
+    summary = _lock_summary(db, match_id)
+    if summary:
+        return summary
+
+    # Column defaults fill in the zero counts
+    db.execute(
+        dialect_insert(db, MatchSummary)
+        .values(match_id=match_id)
+        .on_conflict_do_nothing(index_elements=["match_id"])
+    )
+    return _lock_summary(db, match_id)
+
+
+def apply_stat_to_match_summary(db: Session, stat: Stat):
+    """
+    Fold a newly inserted stat into its match's summary.
+    Does NOT commit - the caller commits it together with the stat so both stay in sync.
+    """
+    summary = _get_summary_for_update(db, stat.match_id)
+
+    rating = stat.rating or 0.0
+    summary.player_count += 1
+    summary.total_goals += stat.goals or 0
+    if stat.team == "home":
+        summary.home_player_count += 1
+        summary.home_rating_sum += rating
+        summary.home_avg_rating = _average(summary.home_rating_sum, summary.home_player_count)
+    elif stat.team == "away":
+        summary.away_player_count += 1
+        summary.away_rating_sum += rating
+        summary.away_avg_rating = _average(summary.away_rating_sum, summary.away_player_count)
+
+    return summary
+
+
+def set_match_mvp(db: Session, match_id: int, player_id):
+    """Record the match's trophy holder (None when the trophy is removed). Does NOT commit."""
+    summary = _get_summary_for_update(db, match_id)
+    summary.mvp_player_id = player_id
+    return summary
+
+
+def get_match_summary(db: Session, match_id: int):
+    """Get a match's summary (None if the match has no row yet)"""
+    return db.query(MatchSummary).filter(MatchSummary.match_id == match_id).first()
+
+
+def _summary_rows(db: Session, match_ids=None) -> list:
+    """match_summaries rows computed from the stats and trophies tables, for the given matches (None = every match)"""
+    stats_query = db.query(
+        Stat.match_id,
+        func.count(Stat.id).label("player_count"),
+        func.sum(case((Stat.team == "home", 1), else_=0)).label("home_player_count"),
+        func.sum(case((Stat.team == "away", 1), else_=0)).label("away_player_count"),
+        func.sum(case((Stat.team == "home", func.coalesce(Stat.rating, 0.0)), else_=0.0)).label("home_rating_sum"),
+        func.sum(case((Stat.team == "away", func.coalesce(Stat.rating, 0.0)), else_=0.0)).label("away_rating_sum"),
+        func.sum(Stat.goals).label("total_goals")
+    )
+    if match_ids is not None:
+        stats_query = stats_query.filter(Stat.match_id.in_(match_ids))
+    stats_subquery = stats_query.group_by(Stat.match_id).subquery()
+
+    query = (
+        db.query(
+            Match.id,
+            stats_subquery.c.player_count,
+            stats_subquery.c.home_player_count,
+            stats_subquery.c.away_player_count,
+            stats_subquery.c.home_rating_sum,
+            stats_subquery.c.away_rating_sum,
+            stats_subquery.c.total_goals,
+            Trophy.awarded_to,
+        )
+        .outerjoin(stats_subquery, Match.id == stats_subquery.c.match_id)
+        .outerjoin(Trophy, Match.id == Trophy.match_id)
+    )
+    if match_ids is not None:
+        query = query.filter(Match.id.in_(match_ids))
+
+    rows = []
+    for r in query.all():
+        home_player_count = int(r.home_player_count or 0)
+        away_player_count = int(r.away_player_count or 0)
+        home_rating_sum = float(r.home_rating_sum or 0.0)
+        away_rating_sum = float(r.away_rating_sum or 0.0)
+        rows.append({
+            "match_id": r.id,
+            "player_count": int(r.player_count or 0),
+            "home_player_count": home_player_count,
+            "away_player_count": away_player_count,
+            "home_rating_sum": home_rating_sum,
+            "away_rating_sum": away_rating_sum,
+            "home_avg_rating": _average(home_rating_sum, home_player_count),
+            "away_avg_rating": _average(away_rating_sum, away_player_count),
+            "total_goals": int(r.total_goals or 0),
+            "mvp_player_id": r.awarded_to,
+        })
+    return rows
+
+
+def rebuild_match_summaries(db: Session) -> int:
+    """
+    Recompute the whole match_summaries table from the stats and trophies tables.
+    Every match gets a row, including matches without any stats.
+    Returns the number of rows written.
+    """
+    rows = _summary_rows(db)
+
+    db.query(MatchSummary).delete()
+    if rows:
+        db.bulk_insert_mappings(MatchSummary, rows)
+    db.commit()
+
+    return len(rows)
+
+
+def refresh_match_summaries(db: Session, match_ids, chunk_size: int = 500) -> int:
+    """
+    Recompute the summary rows of some matches (e.g. the ones an import touched)
+    without rebuilding the whole table. Rows are created if missing and locked
+    in match_id order before their aggregates are read, like
+    refresh_player_totals. Commits once per chunk.
+    Returns the number of rows written.
+    """
+    match_ids = sorted(set(match_ids))
+    written = 0
+    for start in range(0, len(match_ids), chunk_size):
+        chunk = match_ids[start:start + chunk_size]
+        db.execute(
+            dialect_insert(db, MatchSummary)
+            .values([{"match_id": match_id} for match_id in chunk])
+            .on_conflict_do_nothing(index_elements=["match_id"])
+        )
+        (
+            db.query(MatchSummary.match_id)
+            .filter(MatchSummary.match_id.in_(chunk))
+            .order_by(MatchSummary.match_id)
+            .with_for_update()
+            .all()
+        )
+        rows = _summary_rows(db, chunk)
+        db.bulk_update_mappings(MatchSummary, rows)
+        db.commit()
+        written += len(rows)
+    return written
+
+
+def ensure_match_summaries(db: Session) -> bool:
+    """
+    Build the match_summaries table from scratch the first time it appears
+    (i.e. it is empty but matches exist). Matches created later get their row
+    with their first stat.
+    Returns True if a full rebuild was performed.
+    """
+    has_summaries = db.query(MatchSummary.match_id).first() is not None
+    if has_summaries or db.query(Match.id).first() is None:
+        return False
+    return rebuild_match_summaries(db) > 0
@@ -0,0 +1,264 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, update, bindparam, select
+from models.player_total import PlayerTotal
+from models.stat import Stat
+from models.user import User
+from models.trophy import Trophy
+from models.achievement import PlayerAchievement
+from utils.upsert import dialect_insert
+
+
+def _average(rating_sum: float, matches_played: int) -> float:
+    """Average rating rounded the same way every leaderboard displays it"""
+    if not matches_played:
+        return 0.0
+    return round(rating_sum / matches_played, 1)
+
+
+def _lock_totals(db: Session, player_id: int):
+    return (
+        db.query(PlayerTotal)
+        .filter(PlayerTotal.player_id == player_id)
+        .with_for_update()
+        .first()
+    )
+
+
+def _get_totals_for_update(db: Session, player_id: int):
+    """
+    Lock the player's totals row, creating an empty one if it doesn't exist yet.
+    The row is created with ON CONFLICT DO NOTHING, so concurrent first stats
+    of a player both end up locking the same row instead of both inserting it.
+    """
+    totals = _lock_totals(db, player_id)
+    if totals:
+        return totals
+
+    # Column defaults fill in the zero totals
+    db.execute(
+        dialect_insert(db, PlayerTotal)
+        .values(player_id=player_id)
+        .on_conflict_do_nothing(index_elements=["player_id"])
+    )
+    return _lock_totals(db, player_id)
+
+
+def apply_stat_to_totals(db: Session, stat: Stat):
+    """
+    Fold a newly inserted stat into the player's running totals.
+    Does NOT commit - the caller commits it together with the stat so both stay in sync.
+    """
+    totals = _get_totals_for_update(db, stat.player_id)
+
+    goals = stat.goals or 0
+    totals.matches_played += 1
+    totals.total_goals += goals
+    totals.total_assists += stat.assists or 0
+    totals.rating_sum += stat.rating or 0.0
+    totals.avg_rating = _average(totals.rating_sum, totals.matches_played)
+    totals.max_goals_in_match = max(totals.max_goals_in_match, goals)
+
+    return totals
+
+
+def adjust_trophy_count(db: Session, player_id: int, delta: int):
+    """Add delta to a player's trophy count. Does NOT commit."""
+    totals = _get_totals_for_update(db, player_id)
+    totals.trophy_count = max(totals.trophy_count + delta, 0)
+    return totals
+
+
+def adjust_achievement_count(db: Session, user_id: int, delta: int):
+    """Add delta to a player's unlocked achievement count. Does NOT commit."""
+    totals = _get_totals_for_update(db, user_id)
+    totals.achievement_count = max(totals.achievement_count + delta, 0)
+    return totals
+
+
+def add_achievement_counts(db: Session, counts: dict):
+    """
+    Add newly unlocked achievements ({player_id: count}) to the players' counts
+    with achievement_count = achievement_count + n, so concurrent checks never
+    overwrite each other's increments. Rows are created if missing and updated
+    in player_id order (the order every other totals writer locks them in).
+    Does NOT commit.
+    """
+    player_ids = sorted(counts)
+    db.execute(
+        dialect_insert(db, PlayerTotal)
+        .values([{"player_id": player_id} for player_id in player_ids])
+        .on_conflict_do_nothing(index_elements=["player_id"])
+    )
+    table = PlayerTotal.__table__
+    db.execute(
+        update(table)
+        .where(table.c.player_id == bindparam("pid"))
+        .values(achievement_count=table.c.achievement_count + bindparam("delta")),
+        [{"pid": player_id, "delta": counts[player_id]} for player_id in player_ids],
+    )
+
+
+def set_totals_xp(db: Session, user_id: int, xp: int):
+    """Copy a player's XP into their totals row (achievements board tiebreaker). Does NOT commit."""
+    totals = _get_totals_for_update(db, user_id)
+    totals.xp = xp
+    return totals
+
+
+def get_player_totals(db: Session, user_id: int):
+    """Get a player's aggregated totals (None if the player has no row yet)"""
+    return db.query(PlayerTotal).filter(PlayerTotal.player_id == user_id).first()
+
+
+def _totals_rows(db: Session, player_ids=None) -> list:
+    """
+    player_totals rows computed from the stats, trophies and player_achievements
+    tables (and users.xp), for the given users (None = every user)
+    """
+    stats_query = db.query(
+        Stat.player_id,
+        func.count(Stat.id).label("matches_played"),
+        func.sum(Stat.goals).label("total_goals"),
+        func.sum(Stat.assists).label("total_assists"),
+        func.sum(Stat.rating).label("rating_sum"),
+        func.max(Stat.goals).label("max_goals_in_match")
+    )
+    trophy_query = db.query(
+        Trophy.awarded_to,
+        func.count(Trophy.id).label("trophy_count")
+    )
+    achievement_query = (
+        db.query(
+            PlayerAchievement.user_id,
+            func.count(PlayerAchievement.id).label("achievement_count")
+        )
+        .filter(PlayerAchievement.unlocked == True)
+    )
+    if player_ids is not None:
+        stats_query = stats_query.filter(Stat.player_id.in_(player_ids))
+        trophy_query = trophy_query.filter(Trophy.awarded_to.in_(player_ids))
+        achievement_query = achievement_query.filter(PlayerAchievement.user_id.in_(player_ids))
+
+    stats_subquery = stats_query.group_by(Stat.player_id).subquery()
+    trophy_subquery = trophy_query.group_by(Trophy.awarded_to).subquery()
+    achievement_subquery = achievement_query.group_by(PlayerAchievement.user_id).subquery()
+
+    query = (
+        db.query(
+            User.id,
+            func.coalesce(User.xp, 0).label("xp"),
+            stats_subquery.c.matches_played,
+            stats_subquery.c.total_goals,
+            stats_subquery.c.total_assists,
+            stats_subquery.c.rating_sum,
+            stats_subquery.c.max_goals_in_match,
+            trophy_subquery.c.trophy_count,
+            achievement_subquery.c.achievement_count,
+        )
+        .outerjoin(stats_subquery, User.id == stats_subquery.c.player_id)
+        .outerjoin(trophy_subquery, User.id == trophy_subquery.c.awarded_to)
+        .outerjoin(achievement_subquery, User.id == achievement_subquery.c.user_id)
+    )
+    if player_ids is not None:
+        query = query.filter(User.id.in_(player_ids))
+
+    rows = []
+    for r in query.all():
+        matches_played = int(r.matches_played or 0)
+        rating_sum = float(r.rating_sum or 0.0)
+        rows.append({
+            "player_id": r.id,
+            "matches_played": matches_played,
+            "total_goals": int(r.total_goals or 0),
+            "total_assists": int(r.total_assists or 0),
+            "rating_sum": rating_sum,
+            "avg_rating": _average(rating_sum, matches_played),
+            "max_goals_in_match": int(r.max_goals_in_match or 0),
+            "trophy_count": int(r.trophy_count or 0),
+            "achievement_count": int(r.achievement_count or 0),
+            "xp": int(r.xp),
+        })
+    return rows
+
+
+def rebuild_player_totals(db: Session) -> int:
+    """
+    Recompute the whole player_totals table from the stats, trophies and
+    player_achievements tables (and users.xp). Every user gets a row, including users without any stats.
+    Returns the number of rows written.
+    """
+    rows = _totals_rows(db)
+
+    db.query(PlayerTotal).delete()
+    if rows:
+        db.bulk_insert_mappings(PlayerTotal, rows)
+    db.commit()
+
+    return len(rows)
+
+
+def refresh_player_totals(db: Session, player_ids, chunk_size: int = 500) -> int:
+    """
+    Recompute the totals rows of some players (e.g. the ones an import touched)
+    without rebuilding the whole table. Each chunk of rows is created if missing
+    and locked in player_id order before its aggregates are read, so a stat
+    committed meanwhile is either already counted or added on top afterwards,
+    never lost. Commits once per chunk.
+    Returns the number of rows written.
+    """
+    player_ids = sorted(set(player_ids))
+    written = 0
+    for start in range(0, len(player_ids), chunk_size):
+        chunk = player_ids[start:start + chunk_size]
+        db.execute(
+            dialect_insert(db, PlayerTotal)
+            .values([{"player_id": player_id} for player_id in chunk])
+            .on_conflict_do_nothing(index_elements=["player_id"])
+        )
+        (
+            db.query(PlayerTotal.player_id)
+            .filter(PlayerTotal.player_id.in_(chunk))
+            .order_by(PlayerTotal.player_id)
+            .with_for_update()
+            .all()
+        )
+        rows = _totals_rows(db, chunk)
+        db.bulk_update_mappings(PlayerTotal, rows)
+        db.commit()
+        written += len(rows)
+    return written
+
+
+def create_missing_player_totals(db: Session) -> int:
+    """
+    Add an empty player_totals row for every user without one (leaderboards
+    inner-join on it), in one INSERT ... SELECT. Cheap when nothing is missing,
+    so it runs on every startup. Returns the number of rows added.
+    """
+    missing = (
+        select(User.id, func.coalesce(User.xp, 0))
+        .outerjoin(PlayerTotal, User.id == PlayerTotal.player_id)
+        .where(PlayerTotal.player_id.is_(None))
+    )
+    result = db.execute(
+        dialect_insert(db, PlayerTotal)
+        .from_select(["player_id", "xp"], missing)
+        .on_conflict_do_nothing(index_elements=["player_id"])
+    )
+    db.commit()
+    return result.rowcount
+
+
+def ensure_player_totals(db: Session) -> bool:
+    """
+    Make sure every user has a player_totals row (leaderboards inner-join on it).
+    Builds the table from scratch on first run, otherwise only adds empty rows
+    for users that are missing one.
+    Returns True if a full rebuild was performed.
+    """
+    has_totals = db.query(PlayerTotal.player_id).first() is not None
+    if not has_totals:
+        return rebuild_player_totals(db) > 0
+
+    create_missing_player_totals(db)
+    return False
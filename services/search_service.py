@@ -1,39 +1,35 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy import or_
 from models.user import User
 from models.match import Match
-from models.stat import Stat
+from models.player_total import PlayerTotal
 
 def search_players(db: Session, query: str):
     """Search players by username, full_name, or nationality"""
     try:
-        users = db.query(User).filter(
-            or_(
-                User.username.ilike(f"%{query}%"),
-                User.full_name.ilike(f"%{query}%"),
-                User.nationality.ilike(f"%{query}%")
+        users = (
+            db.query(User, PlayerTotal)
+            .outerjoin(PlayerTotal, User.id == PlayerTotal.player_id)
+            .filter(
+                or_(
+                    User.username.ilike(f"%{query}%"),
+                    User.full_name.ilike(f"%{query}%"),
+                    User.nationality.ilike(f"%{query}%")
+                )
             )
-        ).limit(20).all()
+            .limit(20)
+            .all()
+        )
         
-        # Get stats for each user
+        # Attach each user's aggregated totals
         results = []
-        for user in users:
-            try:
-                stats = db.query(
-                    func.count(Stat.id).label("matches_played"),
-                    func.coalesce(func.sum(Stat.goals), 0).label("total_goals"),
-                    func.coalesce(func.sum(Stat.assists), 0).label("total_assists"),
-                    func.coalesce(func.avg(Stat.rating), 0).label("avg_rating"),
-                ).filter(Stat.player_id == user.id).first()
-                
-                player_stats = {
-                    "matches": stats.matches_played or 0 if stats else 0,
-                    "goals": int(stats.total_goals or 0) if stats else 0,
-                    "assists": int(stats.total_assists or 0) if stats else 0,
-                    "rating": round(float(stats.avg_rating or 0), 1) if stats else 0,
-                }
-            except Exception:
-                player_stats = {"matches": 0, "goals": 0, "assists": 0, "rating": 0}
+        for user, totals in users:
+            player_stats = {
+                "matches": totals.matches_played if totals else 0,
+                "goals": totals.total_goals if totals else 0,
+                "assists": totals.total_assists if totals else 0,
+                "rating": round(totals.avg_rating, 1) if totals else 0.0,
+            }
             
             results.append({
                 "id": user.id,
@@ -0,0 +1,261 @@
+"""
+Startup bookkeeping.
+
+The app stores a fingerprint of its schema (tables, columns, indexes and
+constraints) and of the achievement seed data in app_state. When a process
+starts with the same fingerprint, create_all, the player_totals backfill and
+the achievement seeding/check are skipped (only users missing a player_totals
+row get one); otherwise the schema is created before serving and the backfill
+runs in a background thread, which stores the new fingerprint once it has
+succeeded.
+
+With several workers only one backfills at a time: the backfill first claims
+the BACKFILL_LOCK_KEY row in app_state and keeps its updated_at fresh while it
+runs. The others wait for the row, re-check the fingerprint once they get it
+and skip the backfill if the holder already finished it. A claim whose holder
+stopped refreshing it for LOCK_STALE_AFTER seconds (crashed worker) can be taken over.
+"""
+import os
+import time
+import uuid
+import socket
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from database import Base, SessionLocal
+from models.app_state import AppState
+from utils.upsert import dialect_insert
+
+FINGERPRINT_KEY = "startup_fingerprint"
+BACKFILL_LOCK_KEY = "startup_backfill_lock"
+LOCK_HEARTBEAT_INTERVAL = 15  # seconds between refreshes of a held claim
+LOCK_STALE_AFTER = 60  # seconds without a refresh before a claim is considered dead
+
+# Identifies this process as the holder of the backfill claim
+_owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_backfill_thread = None
+
+
+def get_state(db: Session, key: str):
+    row = db.query(AppState).filter(AppState.key == key).first()
+    return row.value if row else None
+
+
+def set_state(db: Session, key: str, value: str):
+    row = db.query(AppState).filter(AppState.key == key).first()
+    if row:
+        row.value = value
+        row.updated_at = datetime.utcnow()
+    else:
+        db.add(AppState(key=key, value=value))
+    db.commit()
+
+
+def startup_fingerprint() -> str:
+    """Hash of the declared schema and the achievement seed definitions"""
+    from scripts.seed_achievements import ACHIEVEMENTS
+
+    schema = []
+    for name, table in sorted(Base.metadata.tables.items()):
+        schema.append({
+            "table": name,
+            "columns": [(c.name, str(c.type), c.nullable) for c in table.columns],
+            "indexes": sorted(i.name for i in table.indexes),
+            "constraints": sorted(c.name for c in table.constraints if c.name),
+        })
+    body = json.dumps({"schema": schema, "achievements": ACHIEVEMENTS}, sort_keys=True, default=str)
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+
+def is_up_to_date(fingerprint: str) -> bool:
+    """True when the database was already set up for this fingerprint"""
+    db = SessionLocal()
+    try:
+        return get_state(db, FINGERPRINT_KEY) == fingerprint
+    except Exception:
+        # app_state does not exist yet (fresh database)
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+def backfill_missing_player_totals():
+    """Give every user without a player_totals row an empty one (runs on every start)"""
+    from services.player_totals_service import create_missing_player_totals
+
+    db = SessionLocal()
+    try:
+        added = create_missing_player_totals(db)
+        if added:
+            print(f"📊 Added player totals for {added} user(s).")
+    except Exception as e:
+        db.rollback()
+        print("⚠️ Missing player totals check skipped:", e)
+    finally:
+        db.close()
+
+
+def claim_backfill_lock(db: Session) -> bool:
+    """
+    Claim the backfill lock row unless another process holds a live claim,
+    in one INSERT ... ON CONFLICT DO UPDATE ... WHERE. True if this process holds it.
+    """
+    now = datetime.utcnow()
+    stmt = dialect_insert(db, AppState).values(key=BACKFILL_LOCK_KEY, value=_owner, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["key"],
+        set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+        where=(AppState.value == _owner) | (AppState.updated_at < now - timedelta(seconds=LOCK_STALE_AFTER)),
+    ).returning(AppState.key)
+    claimed = db.execute(stmt).first() is not None
+    db.commit()
+    return claimed
+
+
+def refresh_backfill_lock(db: Session):
+    """Keep this process's claim alive"""
+    db.query(AppState).filter(AppState.key == BACKFILL_LOCK_KEY, AppState.value == _owner).update(
+        {AppState.updated_at: datetime.utcnow()}, synchronize_session=False
+    )
+    db.commit()
+
+
+def release_backfill_lock(db: Session):
+    """Drop this process's claim so a waiting process can take it right away"""
+    db.query(AppState).filter(AppState.key == BACKFILL_LOCK_KEY, AppState.value == _owner).delete(
+        synchronize_session=False
+    )
+    db.commit()
+
+
+def _wait_for_backfill_lock(fingerprint: str) -> bool:
+    """
+    Block until this process holds the backfill claim.
+    False (claim not taken) once another process has stored `fingerprint`.
+    """
+    while True:
+        db = SessionLocal()
+        try:
+            if claim_backfill_lock(db):
+                return True
+        finally:
+            db.close()
+        if is_up_to_date(fingerprint):
+            return False
+        time.sleep(LOCK_HEARTBEAT_INTERVAL)
+
+
+def _lock_heartbeat(stop: threading.Event):
+    """Refresh the claim every LOCK_HEARTBEAT_INTERVAL seconds until `stop` is set"""
+    while not stop.wait(LOCK_HEARTBEAT_INTERVAL):
+        db = SessionLocal()
+        try:
+            refresh_backfill_lock(db)
+        except Exception as e:
+            db.rollback()
+            print("⚠️ Startup backfill heartbeat failed:", e)
+        finally:
+            db.close()
+
+
+def run_backfill(fingerprint: str):
+    """
+    Backfill player totals and match summaries and seed/check achievements,
+    then record the fingerprint - one process at a time (see the module docstring).
+    """
+    if not _wait_for_backfill_lock(fingerprint):
+        print("📦 Startup backfill already done by another worker.")
+        return
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=_lock_heartbeat, args=(stop,), name="startup-backfill-heartbeat", daemon=True
+    )
+    heartbeat.start()
+    try:
+        # Another worker may have finished it between our fingerprint check and the claim
+        if is_up_to_date(fingerprint):
+            print("📦 Startup backfill already done by another worker.")
+            return
+        _run_backfill_steps(fingerprint)
+    finally:
+        stop.set()
+        heartbeat.join()
+        db = SessionLocal()
+        try:
+            release_backfill_lock(db)
+        finally:
+            db.close()
+
+
+def _run_backfill_steps(fingerprint: str):
+    """The backfill itself; stores the fingerprint only if every step succeeded"""
+    from services.player_totals_service import ensure_player_totals
+    from services.match_summary_service import ensure_match_summaries
+    from scripts.seed_achievements import seed_achievements
+
+    ok = True
+
+    # Backfill player aggregates the first time the player_totals table appears
+    db = SessionLocal()
+    try:
+        if ensure_player_totals(db):
+            print("📊 Player totals rebuilt.")
+    except Exception as e:
+        ok = False
+        print("⚠️ Player totals backfill skipped:", e)
+    finally:
+        db.close()
+
+    # Backfill match aggregates the first time the match_summaries table appears
+    db = SessionLocal()
+    try:
+        if ensure_match_summaries(db):
+            print("📊 Match summaries rebuilt.")
+    except Exception as e:
+        ok = False
+        print("⚠️ Match summaries backfill skipped:", e)
+    finally:
+        db.close()
+
+    # Seed achievements and check existing players against new definitions
+    db = SessionLocal()
+    try:
+        seed_achievements(db, check_existing_players=True)
+        print("🌱 Achievements seeded.")
+    except Exception as e:
+        ok = False
+        print("⚠️ Achievement seeding skipped:", e)
+    finally:
+        db.close()
+
+    if ok:
+        db = SessionLocal()
+        try:
+            set_state(db, FINGERPRINT_KEY, fingerprint)
+        finally:
+            db.close()
+
+
+def start_backfill(fingerprint: str) -> threading.Thread:
+    """Run run_backfill in a background thread so startup does not wait for it"""
+    global _backfill_thread
+    _backfill_thread = threading.Thread(
+        target=run_backfill, args=(fingerprint,), name="startup-backfill", daemon=True
+    )
+    _backfill_thread.start()
+    return _backfill_thread
+
+
+def wait_for_backfill(timeout: float = None) -> bool:
+    """Block until a running backfill has finished; False on timeout"""
+    if _backfill_thread is None:
+        return True
+    _backfill_thread.join(timeout)
+    return not _backfill_thread.is_alive()
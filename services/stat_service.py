@@ -1,12 +1,17 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import case
 from models.stat import Stat
 from models.match import Match
 from models.user import User
-from services.achievement_checker import check_and_unlock_achievements
-from services.trophy_service import award_trophy_for_match
+from services.achievement_checker import check_achievements_for_new_stats
+from services.trophy_service import award_trophy_for_match, award_trophy_for_new_stats
+from services.player_totals_service import apply_stat_to_totals
+from services.match_summary_service import apply_stat_to_match_summary
+from services.job_queue import enqueue, job_handler, job_queue
+from core.cache import leaderboard_cache, lineup_cache, match_cache
 
-def create_stat(db: Session, data):
-    stat = Stat(
+def _new_stat(data) -> Stat:
+    return Stat(
         match_id=data.match_id,
         player_id=data.player_id,
         team=data.team,  # "home" or "away"
@@ -14,33 +19,101 @@ def create_stat(db: Session, data):
         assists=data.assists,
         rating=data.rating
     )
+
+
+def create_stat(db: Session, data):
+    stat = _new_stat(data)
     db.add(stat)
+    db.flush()
+
+    # Keep the player's and the match's aggregates in step with the stats table (same transaction)
+    apply_stat_to_totals(db, stat)
+    apply_stat_to_match_summary(db, stat)
+
+    # Achievements (and XP) and the match trophy are derived in the background;
+    # the jobs are committed with the stat so they survive a restart
+    enqueue(db, "check_stat_achievements", {"stat_ids": [stat.id]})
+    enqueue(db, "award_match_trophy", {"match_id": stat.match_id, "stat_ids": [stat.id]})
+
     db.commit()
     db.refresh(stat)
-    
-    # Check and unlock achievements for this player after stat creation
-    try:
-        result = check_and_unlock_achievements(db, data.player_id, current_stat_id=stat.id)
-        if result:
-            print(f"New achievement(s) unlocked for user {data.player_id}")
-    except Exception as e:
-        # Log error but don't fail stat creation
-        import traceback
-        print(f"Error checking achievements for user {data.player_id}: {e}")
-        print(traceback.format_exc())
-    
-    # Award trophy to best player of the match (recalculates if needed)
-    try:
-        award_trophy_for_match(db, data.match_id)
-    except Exception as e:
-        # Log error but don't fail stat creation
-        import traceback
-        print(f"Error awarding trophy for match {data.match_id}: {e}")
-        print(traceback.format_exc())
-    
+    leaderboard_cache.bump()
+    lineup_cache.bump()
+    match_cache.bump()
+    job_queue.notify()
+
     return stat
 
 
+def create_stats_bulk(db: Session, rows):
+    """
+    Store a whole lineup in one transaction.
+    Achievements are evaluated once per player and the trophy awarded once per
+    match (one background job each), instead of once per stat.
+    """
+    stats = [_new_stat(data) for data in rows]
+    db.add_all(stats)
+    db.flush()
+
+    # Row locks are taken in key order (player totals by player_id, then match
+    # summaries by match_id), so two overlapping bulk writes can't deadlock
+    by_player = {}
+    by_match = {}
+    for stat in sorted(stats, key=lambda s: (s.player_id, s.id)):
+        apply_stat_to_totals(db, stat)
+        by_player.setdefault(stat.player_id, []).append(stat.id)
+    # After all player totals, so the summary row locks are taken last (as in create_stat)
+    for stat in sorted(stats, key=lambda s: (s.match_id, s.id)):
+        apply_stat_to_match_summary(db, stat)
+        by_match.setdefault(stat.match_id, []).append(stat.id)
+
+    for stat_ids in by_player.values():
+        enqueue(db, "check_stat_achievements", {"stat_ids": stat_ids})
+    for match_id, stat_ids in by_match.items():
+        enqueue(db, "award_match_trophy", {"match_id": match_id, "stat_ids": stat_ids})
+
+    db.commit()
+    for stat in stats:
+        db.refresh(stat)
+    leaderboard_cache.bump()
+    lineup_cache.bump()
+    match_cache.bump()
+    job_queue.notify()
+
+    return stats
+
+
+def _job_stats(db: Session, payload: dict):
+    """Stats named by a job payload's "stat_ids" that still exist"""
+    stat_ids = payload.get("stat_ids")
+    if not stat_ids:
+        return []
+    return db.query(Stat).filter(Stat.id.in_(stat_ids)).all()
+
+
+@job_handler("check_stat_achievements")
+def check_stat_achievements_job(db: Session, payload: dict):
+    """Check and unlock achievements for the player(s) of newly stored stats"""
+    by_player = {}
+    for stat in _job_stats(db, payload):
+        by_player.setdefault(stat.player_id, []).append(stat)
+
+    for player_id, stats in by_player.items():
+        if check_achievements_for_new_stats(db, player_id, stats):
+            print(f"New achievement(s) unlocked for user {player_id}")
+
+
+@job_handler("award_match_trophy")
+def award_match_trophy_job(db: Session, payload: dict):
+    """Award trophy to best player of the match, comparing only the new stats with the holder"""
+    stats = _job_stats(db, payload)
+    if stats:
+        award_trophy_for_new_stats(db, stats)
+    else:
+        # Full rescan (the stats are gone or the job only names the match)
+        award_trophy_for_match(db, payload["match_id"])
+
+
 def get_stats_for_match(db: Session, match_id: int):
     return db.query(Stat).filter(Stat.match_id == match_id).all()
 
@@ -88,39 +161,51 @@ def get_user_recent_performances(db: Session, user_id: int, limit: int = 3):
 
 
 def get_match_players_detailed(db: Session, match_id: int):
-    """Get all players in a match with their details, sorted by jersey number"""
-    stats = db.query(Stat).filter(Stat.match_id == match_id).all()
+    """Get all players in a match with their details, sorted by jersey number (one joined query)"""
+    # Default to 99 if no jersey (None or 0, like `jersey_number or 99`)
+    jersey = case((User.jersey_number.is_(None) | (User.jersey_number == 0), 99), else_=User.jersey_number)
+    rows = (
+        db.query(
+            Stat.team,
+            Stat.goals,
+            Stat.assists,
+            Stat.rating,
+            User.id,
+            User.username,
+            User.full_name,
+            User.photo_url,
+            jersey.label("jersey_number"),
+            User.favorite_position,
+            User.nationality,
+        )
+        .join(User, User.id == Stat.player_id)
+        .filter(Stat.match_id == match_id)
+        .order_by(Stat.team, jersey, Stat.id)
+        .all()
+    )
     
     home_players = []
     away_players = []
     
-    for stat in stats:
-        player = db.query(User).filter(User.id == stat.player_id).first()
-        if not player:
-            continue
-            
+    for row in rows:
         player_data = {
-            "id": player.id,
-            "username": player.username,
-            "full_name": player.full_name,
-            "photo_url": player.photo_url,
-            "jersey_number": player.jersey_number or 99,  # Default to 99 if no jersey
-            "favorite_position": player.favorite_position,
-            "nationality": player.nationality,
-            "goals": stat.goals,
-            "assists": stat.assists,
-            "rating": stat.rating,
+            "id": row.id,
+            "username": row.username,
+            "full_name": row.full_name,
+            "photo_url": row.photo_url,
+            "jersey_number": row.jersey_number,
+            "favorite_position": row.favorite_position,
+            "nationality": row.nationality,
+            "goals": row.goals,
+            "assists": row.assists,
+            "rating": row.rating,
         }
         
-        if stat.team == "home":
+        if row.team == "home":
             home_players.append(player_data)
         else:
             away_players.append(player_data)
     
-    # Sort by jersey number
-    home_players.sort(key=lambda x: x["jersey_number"])
-    away_players.sort(key=lambda x: x["jersey_number"])
-    
     return {
         "home_players": home_players,
         "away_players": away_players
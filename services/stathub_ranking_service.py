@@ -1,7 +1,51 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from models.user import User
-from models.stat import Stat
+from models.player_total import PlayerTotal
+
+
+def _sort_key(sort_by: str):
+    """
+    Column the ranking is sorted by (descending) for each sort_by option.
+    Each one has a (key DESC, player_id) index on player_totals.
+    """
+    if sort_by == "goals":
+        return PlayerTotal.total_goals
+    elif sort_by == "assists":
+        return PlayerTotal.total_assists
+    elif sort_by == "combined":
+        return PlayerTotal.total_goals + PlayerTotal.total_assists
+    # "rating" and anything unknown
+    return PlayerTotal.avg_rating
+
+
+def ranking_sort_key(sort_by: str):
+    """Python equivalent of _sort_key (descending, then player_id) for rows that are already loaded"""
+    if sort_by == "goals":
+        return lambda r: (-r.total_goals, r.id)
+    elif sort_by == "assists":
+        return lambda r: (-r.total_assists, r.id)
+    elif sort_by == "combined":
+        return lambda r: (-(r.total_goals + r.total_assists), r.id)
+    return lambda r: (-r.avg_rating, r.id)
+
+
+def ranking_entry(r, rank: int) -> dict:
+    combined = (r.total_goals or 0) + (r.total_assists or 0)
+
+    return {
+        "user_id": r.id,
+        "username": r.username,
+        "full_name": r.full_name,
+        "photo_url": r.photo_url,
+        "nationality": r.nationality,
+        "position": r.favorite_position,
+        "total_goals": r.total_goals or 0,
+        "total_assists": r.total_assists or 0,
+        "avg_rating": round(r.avg_rating or 0, 1),
+        "matches_played": r.matches_played or 0,
+        "combined": combined,
+        "rank": rank,
+    }
 
 
 def get_stathub_ranking(db: Session, sort_by: str = "rating", limit: int = 50):
@@ -9,21 +53,14 @@ def get_stathub_ranking(db: Session, sort_by: str = "rating", limit: int = 50):
     Get StatHub ranking leaderboard sorted by different metrics.
     sort_by options: "rating", "goals", "assists", "combined"
     Excludes admin users.
+    Sorting and the limit are applied in the database by walking the sort key's
+    (key DESC, player_id) index, so only the first `limit` players are read.
+    A player's rank is their position in that order.
     """
-    # Get aggregated stats for each user
-    stats_subquery = (
-        db.query(
-            Stat.player_id,
-            func.sum(Stat.goals).label("total_goals"),
-            func.sum(Stat.assists).label("total_assists"),
-            func.avg(Stat.rating).label("avg_rating"),
-            func.count(Stat.id).label("matches_played")
-        )
-        .group_by(Stat.player_id)
-        .subquery()
-    )
+    # Sort by the selected metric, player_id keeps ties stable (and matches the index)
+    order = (_sort_key(sort_by).desc(), PlayerTotal.player_id)
 
-    # Join with users
+    # Join users with their aggregated totals
     results = (
         db.query(
             User.id,
@@ -32,50 +69,16 @@ def get_stathub_ranking(db: Session, sort_by: str = "rating", limit: int = 50):
             User.photo_url,
             User.nationality,
             User.favorite_position,
-            func.coalesce(stats_subquery.c.total_goals, 0).label("total_goals"),
-            func.coalesce(stats_subquery.c.total_assists, 0).label("total_assists"),
-            func.coalesce(stats_subquery.c.avg_rating, 0).label("avg_rating"),
-            func.coalesce(stats_subquery.c.matches_played, 0).label("matches_played"),
+            PlayerTotal.total_goals,
+            PlayerTotal.total_assists,
+            PlayerTotal.avg_rating,
+            PlayerTotal.matches_played,
         )
-        .outerjoin(stats_subquery, User.id == stats_subquery.c.player_id)
+        .join(PlayerTotal, User.id == PlayerTotal.player_id)
         .filter(User.role == "player")  # Exclude admin
+        .order_by(*order)
+        .limit(limit)
         .all()
     )
 
-    # Build leaderboard
-    leaderboard = []
-    for r in results:
-        combined = (r.total_goals or 0) + (r.total_assists or 0)
-        
-        leaderboard.append({
-            "user_id": r.id,
-            "username": r.username,
-            "full_name": r.full_name,
-            "photo_url": r.photo_url,
-            "nationality": r.nationality,
-            "position": r.favorite_position,
-            "total_goals": r.total_goals or 0,
-            "total_assists": r.total_assists or 0,
-            "avg_rating": round(r.avg_rating or 0, 1),
-            "matches_played": r.matches_played or 0,
-            "combined": combined,
-        })
-
-    # Sort by the selected metric
-    if sort_by == "rating":
-        leaderboard.sort(key=lambda x: x["avg_rating"], reverse=True)
-    elif sort_by == "goals":
-        leaderboard.sort(key=lambda x: x["total_goals"], reverse=True)
-    elif sort_by == "assists":
-        leaderboard.sort(key=lambda x: x["total_assists"], reverse=True)
-    elif sort_by == "combined":
-        leaderboard.sort(key=lambda x: x["combined"], reverse=True)
-    else:
-        leaderboard.sort(key=lambda x: x["avg_rating"], reverse=True)
-
-    # Add rank
-    for i, player in enumerate(leaderboard[:limit], 1):
-        player["rank"] = i
-
-    return leaderboard[:limit]
-
+    return [ranking_entry(r, rank) for rank, r in enumerate(results, 1)]
@@ -1,9 +1,57 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc
+from sqlalchemy import desc, asc, func, case, select
 from models.trophy import Trophy
 from models.stat import Stat
+from services.player_totals_service import adjust_trophy_count
+from services.match_summary_service import set_match_mvp
+from core.cache import leaderboard_cache, match_cache
+from utils.upsert import dialect_insert
 from datetime import datetime
 
+# Best player ordering: highest rating, then goals, then assists, then earliest stat
+TROPHY_ORDER = (desc(Stat.rating), desc(Stat.goals), desc(Stat.assists), asc(Stat.created_at), asc(Stat.id))
+
+
+def _trophy_key(stat: Stat):
+    """Python equivalent of TROPHY_ORDER (smaller is better)"""
+    return (-(stat.rating or 0), -(stat.goals or 0), -(stat.assists or 0), stat.created_at, stat.id)
+
+
+def _set_holder(db: Session, trophy: Trophy, stat: Stat):
+    """Move an existing trophy to `stat` (no commit)"""
+    if trophy.awarded_to != stat.player_id:
+        # Lock both totals rows in player_id order, like every other totals writer,
+        # so opposite moves (or a bulk stat insert) can't deadlock with this one
+        for player_id, delta in sorted(((trophy.awarded_to, -1), (stat.player_id, 1))):
+            adjust_trophy_count(db, player_id, delta)
+        trophy.awarded_to = stat.player_id
+        trophy.date_awarded = datetime.utcnow()
+        set_match_mvp(db, trophy.match_id, stat.player_id)
+    trophy.best_stat_id = stat.id
+
+
+def _insert_trophy(db: Session, stat: Stat):
+    """
+    Upsert on uq_trophy_match_id: create the match's trophy for `stat` unless one exists.
+    Returns True if this call created it (no commit).
+    """
+    created = db.execute(
+        dialect_insert(db, Trophy)
+        .values(
+            match_id=stat.match_id,
+            awarded_to=stat.player_id,
+            best_stat_id=stat.id,
+            date_awarded=datetime.utcnow(),
+        )
+        .on_conflict_do_nothing(index_elements=["match_id"])
+        .returning(Trophy.id)
+    ).first()
+    if created:
+        adjust_trophy_count(db, stat.player_id, 1)
+        set_match_mvp(db, stat.match_id, stat.player_id)
+    return created is not None
+
+
 def award_trophy_for_match(db: Session, match_id: int):
     """
     Award trophy to the best player of a match based on:
@@ -13,64 +61,133 @@ def award_trophy_for_match(db: Session, match_id: int):
     4. If still tied: earliest created_at stat record
     
     This function will recalculate and update the trophy if one already exists.
+    New stats go through award_trophy_for_new_stat instead of this full rescan.
     """
-    # Get all stats for this match
-    stats = db.query(Stat).filter(Stat.match_id == match_id).all()
+    # Best stat of the match, picked by the database
+    best_stat = (
+        db.query(Stat)
+        .filter(Stat.match_id == match_id)
+        .order_by(*TROPHY_ORDER)
+        .first()
+    )
+    
+    # Check if trophy already exists
+    existing_trophy = db.query(Trophy).filter(Trophy.match_id == match_id).with_for_update().first()
     
-    if not stats:
+    if not best_stat:
         # No stats yet, delete existing trophy if any
-        existing_trophy = db.query(Trophy).filter(Trophy.match_id == match_id).first()
         if existing_trophy:
+            adjust_trophy_count(db, existing_trophy.awarded_to, -1)
+            set_match_mvp(db, match_id, None)
             db.delete(existing_trophy)
             db.commit()
+            leaderboard_cache.bump()
+            match_cache.bump()
+        else:
+            db.rollback()
         return None
     
-    # Find the best player
-    best_stat = None
-    for stat in stats:
-        if best_stat is None:
-            best_stat = stat
-            continue
-        
-        # Compare by rating (highest first)
-        if stat.rating > best_stat.rating:
-            best_stat = stat
-        elif stat.rating == best_stat.rating:
-            # Tiebreaker 1: Goals
-            if stat.goals > best_stat.goals:
-                best_stat = stat
-            elif stat.goals == best_stat.goals:
-                # Tiebreaker 2: Assists
-                if stat.assists > best_stat.assists:
-                    best_stat = stat
-                elif stat.assists == best_stat.assists:
-                    # Tiebreaker 3: Earliest created_at
-                    if stat.created_at < best_stat.created_at:
-                        best_stat = stat
-    
-    # Check if trophy already exists
-    existing_trophy = db.query(Trophy).filter(Trophy.match_id == match_id).first()
-    
     if existing_trophy:
         # Update existing trophy if the best player changed
-        if existing_trophy.awarded_to != best_stat.player_id:
-            existing_trophy.awarded_to = best_stat.player_id
-            existing_trophy.date_awarded = datetime.utcnow()
-            db.commit()
-            db.refresh(existing_trophy)
+        changed = existing_trophy.awarded_to != best_stat.player_id
+        _set_holder(db, existing_trophy, best_stat)
+        db.commit()
+        if changed:
+            leaderboard_cache.bump()
+            match_cache.bump()
         return existing_trophy
-    else:
-        # Create new trophy
-        trophy = Trophy(
-            match_id=match_id,
-            awarded_to=best_stat.player_id,
-            date_awarded=datetime.utcnow()
-        )
-        db.add(trophy)
+    
+    # Create new trophy
+    _insert_trophy(db, best_stat)
+    db.commit()
+    leaderboard_cache.bump()
+    match_cache.bump()
+    return db.query(Trophy).filter(Trophy.match_id == match_id).first()
+
+
+def award_trophy_for_new_stat(db: Session, stat: Stat):
+    """
+    Incremental trophy award for a stat that was just added to its match.
+    Only the incoming stat is compared with the current holder's stat
+    (same ordering as award_trophy_for_match).
+    """
+    if _insert_trophy(db, stat):
+        # First stat of the match
         db.commit()
-        db.refresh(trophy)
+        leaderboard_cache.bump()
+        match_cache.bump()
+        return db.query(Trophy).filter(Trophy.match_id == stat.match_id).first()
+
+    # Lock the trophy so concurrent stats for the same match are compared one at a time
+    trophy = db.query(Trophy).filter(Trophy.match_id == stat.match_id).with_for_update().first()
+    holder = db.query(Stat).filter(Stat.id == trophy.best_stat_id).first() if trophy.best_stat_id else None
+
+    if holder is None:
+        # Trophy predates best_stat_id (or its stat is gone) - fall back to a full rescan
+        db.rollback()
+        return award_trophy_for_match(db, stat.match_id)
+
+    if holder.id == stat.id or _trophy_key(stat) >= _trophy_key(holder):
+        db.rollback()
         return trophy
 
+    changed = trophy.awarded_to != stat.player_id
+    _set_holder(db, trophy, stat)
+    db.commit()
+    if changed:
+        leaderboard_cache.bump()
+        match_cache.bump()
+    return trophy
+
+
+def award_trophy_for_new_stats(db: Session, stats):
+    """award_trophy_for_new_stat for several new stats of one match: only the best of them can take the trophy"""
+    return award_trophy_for_new_stat(db, min(stats, key=_trophy_key))
+
+
+def rebuild_trophies(db: Session, match_ids=None) -> int:
+    """
+    Award every match's trophy in one INSERT ... SELECT ... ON CONFLICT (uq_trophy_match_id)
+    statement, e.g. after a bulk import. date_awarded only changes when the holder does.
+    match_ids: only these matches (None = every match)
+    Does not touch player_totals or match_summaries - rebuild or refresh them afterwards.
+    Returns the number of trophies inserted or changed.
+    """
+    ranked = db.query(
+        Stat.id.label("stat_id"),
+        Stat.match_id,
+        Stat.player_id,
+        func.row_number().over(partition_by=Stat.match_id, order_by=TROPHY_ORDER).label("position"),
+    )
+    if match_ids is not None:
+        ranked = ranked.filter(Stat.match_id.in_(match_ids))
+    ranked = ranked.subquery()
+    best = (
+        select(ranked.c.match_id, ranked.c.player_id, ranked.c.stat_id, func.now())
+        .where(ranked.c.position == 1)
+    )
+
+    stmt = dialect_insert(db, Trophy).from_select(
+        ["match_id", "awarded_to", "best_stat_id", "date_awarded"], best
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["match_id"],
+        set_={
+            "awarded_to": stmt.excluded.awarded_to,
+            "best_stat_id": stmt.excluded.best_stat_id,
+            "date_awarded": case(
+                (Trophy.awarded_to != stmt.excluded.awarded_to, stmt.excluded.date_awarded),
+                else_=Trophy.date_awarded,
+            ),
+        },
+        where=Trophy.best_stat_id.is_distinct_from(stmt.excluded.best_stat_id),
+    )
+    result = db.execute(stmt)
+    db.commit()
+    leaderboard_cache.bump()
+    match_cache.bump()
+    return result.rowcount
+
 
 def get_user_trophy_count(db: Session, user_id: int) -> int:
     """Get total trophy count for a user"""
@@ -89,6 +206,11 @@ def award_trophy(db: Session, data):
         awarded_to=data.awarded_to
     )
     db.add(trophy)
+    adjust_trophy_count(db, data.awarded_to, 1)
+    if trophy.match_id:
+        set_match_mvp(db, trophy.match_id, data.awarded_to)
     db.commit()
     db.refresh(trophy)
+    leaderboard_cache.bump()
+    match_cache.bump()
     return trophy
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from models.user import User
+from core.cache import leaderboard_cache, lineup_cache, match_cache
 
 def get_user_by_id(db: Session, user_id: int):
     user = db.query(User).filter(User.id == user_id).first()
@@ -9,6 +10,16 @@ def get_user_by_id(db: Session, user_id: int):
     return user
 
 
+def invalidate_user_caches():
+    """
+    Call after committing a change to a user's name, photo, position or role:
+    leaderboards, lineups and match pages all show them.
+    """
+    leaderboard_cache.bump()
+    lineup_cache.bump()
+    match_cache.bump()
+
+
 def update_user(db: Session, user: User, data):
     # Use model_dump for Pydantic V2, fallback to dict for V1
     if hasattr(data, 'model_dump'):
@@ -20,4 +31,5 @@ def update_user(db: Session, user: User, data):
         setattr(user, field, value)
     db.commit()
     db.refresh(user)
+    invalidate_user_caches()
     return user
@@ -1,27 +1,28 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case, and_, update
 from models.user import User
 from models.achievement import PlayerAchievement, Achievement
-from core.levels import get_level_from_xp, get_xp_progress
+from models.player_total import PlayerTotal
+from services.player_totals_service import set_totals_xp
+from core.levels import LEVEL_CONFIG, get_level_from_xp, get_xp_progress
 
 
 def calculate_user_xp(db: Session, user_id: int) -> int:
     """
     Calculate total XP from unlocked achievements.
-    XP = sum of points from all unlocked achievements
+    XP = sum of points from all unlocked achievements (one SUM query)
     """
-    unlocked_achievements = (
-        db.query(PlayerAchievement)
+    total_xp = (
+        db.query(func.coalesce(func.sum(Achievement.points), 0))
+        .select_from(PlayerAchievement)
         .join(Achievement, PlayerAchievement.achievement_id == Achievement.id)
         .filter(
             PlayerAchievement.user_id == user_id,
             PlayerAchievement.unlocked == True
         )
-        .all()
+        .scalar()
     )
-    
-    total_xp = sum(ach.achievement.points for ach in unlocked_achievements)
-    return total_xp
+    return int(total_xp)
 
 
 def update_user_xp_and_level(db: Session, user_id: int):
@@ -41,6 +42,7 @@ def update_user_xp_and_level(db: Session, user_id: int):
     # Update user
     user.xp = total_xp
     user.level = level
+    set_totals_xp(db, user_id, total_xp)
     db.commit()
     db.refresh(user)
     
@@ -59,3 +61,50 @@ def get_user_xp_info(db: Session, user_id: int) -> dict:
     
     return get_xp_progress(user.xp, user.level)
 
+
+def level_case(xp_column):
+    """SQL equivalent of get_level_from_xp (same LEVEL_CONFIG thresholds)"""
+    return case(
+        *[(xp_column >= LEVEL_CONFIG[level]["min_xp"], level) for level in range(10, 1, -1)],
+        else_=1
+    )
+
+
+def recalculate_xp_for_users(db: Session, user_ids=None) -> int:
+    """
+    Recalculate XP and level for many users in a single UPDATE ... FROM (aggregate),
+    and copy the XP into player_totals with a second one.
+    user_ids: users to update (None = every user)
+    Returns the number of users updated.
+    """
+    xp_query = (
+        db.query(
+            User.id.label("user_id"),
+            func.coalesce(func.sum(Achievement.points), 0).label("xp")
+        )
+        .outerjoin(
+            PlayerAchievement,
+            and_(PlayerAchievement.user_id == User.id, PlayerAchievement.unlocked == True)
+        )
+        .outerjoin(Achievement, PlayerAchievement.achievement_id == Achievement.id)
+        .group_by(User.id)
+    )
+    if user_ids is not None:
+        xp_query = xp_query.filter(User.id.in_(user_ids))
+    xp_subquery = xp_query.subquery()
+
+    result = db.execute(
+        update(User)
+        .where(User.id == xp_subquery.c.user_id)
+        .values(xp=xp_subquery.c.xp, level=level_case(xp_subquery.c.xp))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(PlayerTotal)
+        .where(PlayerTotal.player_id == xp_subquery.c.user_id)
+        .values(xp=xp_subquery.c.xp)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    return result.rowcount
@@ -0,0 +1,22 @@
+"""
+Runs scripts/check_query_plans.py against a freshly seeded SQLite file:
+fails when a read query in services/ falls back to a sequential scan of a
+large table, or when a new read function has no plan check.
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_read_queries_use_indexes(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'plans.db'}"
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "scripts", "check_query_plans.py"), "--database-url", database_url, "--seed"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=600,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
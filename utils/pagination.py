@@ -1,4 +1,29 @@
+import base64
+from datetime import datetime
+
+
 def paginate(query, page: int = 1, limit: int = 20):
     page = max(page, 1)
     offset = (page - 1) * limit
     return query.offset(offset).limit(limit)
+
+
+def encode_cursor(sort_value: datetime, *row_ids: int) -> str:
+    """Opaque keyset cursor for a (datetime, id[, id...]) sort position"""
+    raw = "|".join([sort_value.isoformat(), *(str(row_id) for row_id in row_ids)])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, ids: int = 1):
+    """
+    Inverse of encode_cursor: (datetime, id) or, with ids > 1, (datetime, id, id, ...).
+    Raises ValueError for a malformed cursor or one with a different number of ids
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        sort_value, *row_ids = raw.split("|")
+        if len(row_ids) != ids:
+            raise ValueError
+        return (datetime.fromisoformat(sort_value), *(int(row_id) for row_id in row_ids))
+    except Exception:
+        raise ValueError("Invalid cursor")
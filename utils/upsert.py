@@ -0,0 +1,12 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def dialect_insert(db, model):
+    """
+    INSERT statement for the session's database that supports
+    on_conflict_do_nothing / on_conflict_do_update (Postgres in production,
+    SQLite for local runs).
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)